@@ -0,0 +1,120 @@
+"""
+Compare the throughput and CPU time of the download loops against a local HTTP server.
+
+The legacy loop is the one DownloadFileTask used before adaptive chunk sizing:
+iter_content with 1 KB chunks and a progress report per chunk. The adaptive loop
+is layeratlas.core.download_io.stream_response with time-throttled progress.
+
+Run it with the Python interpreter shipped with QGIS (it only needs requests):
+
+    python benchmarks/download_throughput.py --size-mb 256 --repeat 3
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from layeratlas.core.download_io import ProgressThrottle, stream_response  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(directory, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "http.server", str(port), "--bind", "127.0.0.1", "--directory", directory],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(50):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("HTTP server did not start")
+
+
+def legacy_loop(url, dest, total_size):
+    reports = 0
+    downloaded = 0
+    response = requests.get(url, stream=True, timeout=10)
+    response.raise_for_status()
+    with open(dest, "wb") as file:
+        for chunk in response.iter_content(chunk_size=1024):
+            if chunk:
+                file.write(chunk)
+                downloaded += len(chunk)
+                _ = (downloaded / total_size) * 100
+                reports += 1
+    return reports
+
+
+def adaptive_loop(url, dest, total_size):
+    reports = []
+    downloaded = 0
+    progress = ProgressThrottle(reports.append)
+
+    def on_data(size):
+        nonlocal downloaded
+        downloaded += size
+        progress.update((downloaded / total_size) * 100, force=downloaded >= total_size)
+
+    response = requests.get(url, stream=True, timeout=10)
+    response.raise_for_status()
+    with open(dest, "wb") as file:
+        stream_response(response, file, should_stop=lambda: False, on_data=on_data)
+    return len(reports)
+
+
+def measure(loop, url, dest, total_size, repeat):
+    results = []
+    for _ in range(repeat):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        reports = loop(url, dest, total_size)
+        results.append((time.perf_counter() - wall, time.process_time() - cpu, reports))
+        assert os.path.getsize(dest) == total_size
+        os.remove(dest)
+    return min(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256, help="size of the served file")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per loop, the best one is kept")
+    args = parser.parse_args()
+
+    total_size = args.size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "data.bin"), "wb") as file:
+            for _ in range(args.size_mb):
+                file.write(os.urandom(1024 * 1024))
+
+        port = free_port()
+        server = start_server(directory, port)
+        url = f"http://127.0.0.1:{port}/data.bin"
+        dest = os.path.join(directory, "download.bin")
+
+        try:
+            print(f"{'loop':<10} {'wall (s)':>10} {'cpu (s)':>10} {'MB/s':>10} {'progress':>10}")
+            for name, loop in (("legacy", legacy_loop), ("adaptive", adaptive_loop)):
+                wall, cpu, reports = measure(loop, url, dest, total_size, args.repeat)
+                print(f"{name:<10} {wall:>10.2f} {cpu:>10.2f} {args.size_mb / wall:>10.1f} {reports:>10}")
+        finally:
+            server.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Compare the requests and HTTP/2 download backends on many small files.
+
+A local Hypercorn server speaking HTTP/1.1 and HTTP/2 over TLS (a throwaway
+certificate from trustme) serves --files files of --size bytes. They are
+fetched by --threads concurrent workers, like the segments and tasks of a
+multi-file dataset, through:
+
+- requests: the per-thread sessions of layeratlas.core.http_session, HTTP/1.1
+  keep-alive connections shared through one pool,
+- requests, new connection per file: what a download pays without reuse,
+- http2: layeratlas.core.http2_session, streams multiplexed on one connection.
+
+Every backend pays its own TCP and TLS handshakes, nothing is shared between them.
+Run it with the Python interpreter shipped with QGIS, with the optional
+packages installed:
+
+    python -m pip install "httpx[http2]" hypercorn trustme
+    python benchmarks/http2_download.py --files 200 --size 65536 --threads 8
+"""
+import os
+import sys
+import ssl
+import socket
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+import trustme  # noqa: E402
+from hypercorn.asyncio import serve  # noqa: E402
+from hypercorn.config import Config  # noqa: E402
+
+from layeratlas.core.download_io import stream_response  # noqa: E402
+from layeratlas.core.http_session import SessionPool  # noqa: E402
+from layeratlas.core.http2_session import Http2Session  # noqa: E402
+
+
+def make_app(size):
+    body = os.urandom(size)
+
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-length", str(size).encode()), (b"content-type", b"application/octet-stream")],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, cert_file, key_file):
+    """Serves the app over TLS with ALPN h2 and http/1.1 in a background thread, returns the port."""
+    port = free_port()
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.certfile = cert_file
+    config.keyfile = key_file
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.loglevel = "WARNING"
+
+    async def run():
+        # A shutdown trigger keeps Hypercorn from installing signal handlers, only allowed in the main thread
+        await serve(app, config, shutdown_trigger=asyncio.Event().wait)
+
+    threading.Thread(target=lambda: asyncio.run(run()), daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return port
+
+
+def fetch_all(fetch, urls, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        total = sum(executor.map(fetch, urls))
+    return time.perf_counter() - started, total
+
+
+def streamed(get):
+    """Wraps a get(url) function into a fetch(url) streaming the body like DownloadFileTask."""
+    def fetch(url):
+        response = get(url)
+        response.raise_for_status()
+        with open(os.devnull, "wb") as file:
+            written = stream_response(response, file)
+        response.close()
+        return written
+
+    return fetch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=200, help="number of files to download")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="size of each file in bytes")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent downloads")
+    args = parser.parse_args()
+
+    authority = trustme.CA()
+    certificate = authority.issue_cert("localhost", "127.0.0.1")
+    with tempfile.TemporaryDirectory() as folder:
+        cert_file = os.path.join(folder, "cert.pem")
+        key_file = os.path.join(folder, "key.pem")
+        ca_file = os.path.join(folder, "ca.pem")
+        certificate.cert_chain_pems[0].write_to_path(cert_file)
+        certificate.private_key_pem.write_to_path(key_file)
+        authority.cert_pem.write_to_path(ca_file)
+
+        port = start_server(make_app(args.size), cert_file, key_file)
+        urls = [f"https://localhost:{port}/file/{index}" for index in range(args.files)]
+
+        pool = SessionPool(args.threads, args.threads)
+        http2 = Http2Session(args.threads, args.threads, verify=ssl.create_default_context(cafile=ca_file))
+
+        def new_connection(url):
+            with requests.Session() as session:
+                return streamed(lambda url: session.get(url, stream=True, verify=ca_file))(url)
+
+        backends = (
+            ("requests", streamed(lambda url: pool.session().get(url, stream=True, verify=ca_file))),
+            ("requests, new connection", new_connection),
+            ("http2", streamed(lambda url: http2.get(url, stream=True))),
+        )
+
+        print(f"{'backend':<26} {'seconds':>9} {'files/s':>9} {'MB/s':>8}")
+        for name, get in backends:
+            elapsed, total = fetch_all(get, urls, args.threads)
+            print(f"{name:<26} {elapsed:>9.3f} {args.files / elapsed:>9.1f} {total / elapsed / 1e6:>8.1f}")
+
+        print(f"requests pool: {pool.stats()}")
+        print(f"http2: {http2.stats()}")
+
+
+if __name__ == "__main__":
+    main()
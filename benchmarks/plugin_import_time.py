@@ -0,0 +1,57 @@
+"""
+Measure the import time of the plugin modules in fresh interpreters.
+
+Each run starts a new Python process, so nothing is cached in sys.modules.
+"warm" runs reuse the __pycache__ bytecode, "cold" runs compile every module
+from source, as on the first QGIS start after installing or updating the plugin.
+
+Run it with the Python interpreter shipped with QGIS, on each revision to compare:
+
+    python benchmarks/plugin_import_time.py --runs 20
+    git checkout <other revision> && python benchmarks/plugin_import_time.py --runs 20
+"""
+import os
+import sys
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+
+def import_time(module, cold) -> float:
+    command = [sys.executable]
+    with tempfile.TemporaryDirectory() as pycache:
+        if cold:
+            command += ["-X", f"pycache_prefix={pycache}"]
+        command += ["-c", SNIPPET.format(root=ROOT, module=module)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="layeratlas.layer_atlas", help="module to import")
+    parser.add_argument("--runs", type=int, default=10, help="runs per mode")
+    args = parser.parse_args()
+
+    # Populate __pycache__ for the warm runs
+    import_time(args.module, cold=False)
+
+    print(f"{args.module}: median of {args.runs} runs")
+    for mode in ("warm", "cold"):
+        times = [import_time(args.module, cold=mode == "cold") for _ in range(args.runs)]
+        print(f"  {mode:<5} {statistics.median(times) * 1000:8.1f} ms  (min {min(times) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
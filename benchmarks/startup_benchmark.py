@@ -0,0 +1,74 @@
+"""
+Measure each phase of the plugin startup in a headless QGIS application.
+
+Phases: importing the plugin, classFactory / LayerAtlas.__init__, initGui,
+resolving the Qt web bindings, creating the WebEngineView and loading the
+Layer Atlas page. The timings come from the spans recorded by
+layeratlas.helper.logging_helper.
+
+Run it with the Python interpreter shipped with QGIS:
+
+    python benchmarks/startup_benchmark.py --trace startup.trace.json
+
+A file ending with .trace.json is written in the Chrome trace format and can be
+opened in chrome://tracing or https://ui.perfetto.dev, other names get plain JSON.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qgis.testing import start_app  # noqa: E402
+from qgis.testing.mocked import get_iface  # noqa: E402
+from qgis.PyQt.QtCore import QEventLoop, QTimer  # noqa: E402
+
+
+def wait_for_page_load(dockwidget, timeout):
+    view = getattr(dockwidget, "view", None)
+    if view is None:
+        return
+
+    loop = QEventLoop()
+    view.loadFinished.connect(lambda ok: QTimer.singleShot(0, loop.quit))
+    QTimer.singleShot(int(timeout * 1000), loop.quit)
+    loop.exec()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trace", help="export the spans to this file")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for the page load")
+    parser.add_argument("--no-web", action="store_true", help="stop after initGui, skip the web view")
+    args = parser.parse_args()
+
+    start_app()
+    iface = get_iface()
+
+    started = time.perf_counter()
+    import layeratlas
+    from layeratlas.helper.logging_helper import spans
+
+    plugin = layeratlas.classFactory(iface)
+    plugin.initGui()
+
+    if not args.no_web:
+        plugin.create_dockwidget()
+        wait_for_page_load(plugin.dockwidget, args.timeout)
+    total = time.perf_counter() - started
+
+    print(f"{'phase':<40} {'ms':>10}")
+    for span in spans.spans:
+        print(f"{span['name']:<40} {span['duration'] * 1000:>10.1f}")
+    print(f"{'total':<40} {total * 1000:>10.1f}")
+
+    if args.trace:
+        spans.export(args.trace)
+
+    plugin.unload()
+
+
+if __name__ == "__main__":
+    main()
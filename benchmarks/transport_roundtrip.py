@@ -0,0 +1,153 @@
+"""
+Measure the WebChannel transport round-trip latency and bytes on the wire.
+
+A local QWebSocketServer wraps its connection in a WebSocketTransport that echoes
+every message back. A QWebSocket client sends messages of increasing size, a
+small method call, layer definition XMLs and a base64 canvas image, in each
+framing: the legacy indented JSON text, compact JSON text, compact JSON binary
+and zlib compressed binary frames. The client inflates compressed frames, so
+their round trip includes compressing and decompressing the message.
+
+Run it with the Python interpreter shipped with QGIS:
+
+    python benchmarks/transport_roundtrip.py --repeat 50
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import base64
+import argparse
+import statistics
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qgis.testing import start_app  # noqa: E402
+from qgis.PyQt.QtCore import QEventLoop, QJsonDocument, QUrl  # noqa: E402
+
+start_app()
+
+from layeratlas.communication import QHostAddress, QWebSocketServer  # noqa: E402
+from layeratlas.communication.web_socket_transport import (  # noqa: E402
+    COMPRESSED_MAGIC,
+    FORMAT_BINARY,
+    FORMAT_TEXT,
+    WebSocketTransport,
+)
+
+QWebSocket = getattr(__import__(QWebSocketServer.__module__, fromlist=["QWebSocket"]), "QWebSocket")
+
+
+class LegacyTransport(WebSocketTransport):
+    """The transport as it was before compact framing: indented JSON text frames."""
+
+    def sendMessage(self, message):
+        json_bytes = QJsonDocument(message).toJson()
+        self._socket.sendTextMessage(bytes(json_bytes).decode("utf-8"))
+
+
+def categorized_layer_xml(classes=800):
+    """A layer definition with a categorized renderer, one fill symbol per class."""
+    rng = random.Random(1)
+    categories = "".join(
+        f'<category render="true" symbol="{i}" value="class_{i}" label="Class {i}" type="string"/>'
+        for i in range(classes)
+    )
+    symbols = "".join(
+        f'<symbol name="{i}" type="fill" alpha="1" clip_to_extent="1" force_rhr="0">'
+        f'<layer class="SimpleFill" enabled="1" locked="0" pass="0"><Option type="Map">'
+        f'<Option name="color" type="QString" value="{rng.randint(0, 255)},{rng.randint(0, 255)},{rng.randint(0, 255)},255"/>'
+        f'<Option name="outline_width" type="QString" value="0.26"/>'
+        f'<Option name="style" type="QString" value="solid"/></Option></layer></symbol>'
+        for i in range(classes)
+    )
+    return f"<maplayer><renderer-v2 type='categorizedSymbol'><categories>{categories}</categories><symbols>{symbols}</symbols></renderer-v2></maplayer>"
+
+
+def svg_layer_xml(markers=3):
+    """A layer definition with SVG marker symbols embedded as base64."""
+    rng = random.Random(2)
+    path = " ".join(f"L{rng.random():.4f} {rng.random():.4f}" for _ in range(3000))
+    svg = base64.b64encode(f'<svg xmlns="http://www.w3.org/2000/svg"><path d="M0 0 {path}"/></svg>'.encode()).decode()
+    option = f'<Option name="name" type="QString" value="base64:{svg}"/>'
+    return f"<maplayer><symbol type='marker'>{option * markers}</symbol></maplayer>"
+
+
+def payloads():
+    image = base64.b64encode(os.urandom(1500 * 1024)).decode("ascii")
+    return {
+        "method call": {"type": 6, "id": 1, "object": "communicationBus", "method": 3, "args": ["key"]},
+        "categorized": {"type": 1, "object": "communicationBus", "signal": 5, "args": [categorized_layer_xml()]},
+        "embedded SVG": {"type": 1, "object": "communicationBus", "signal": 5, "args": [svg_layer_xml()]},
+        "canvas image": {"type": 10, "id": 2, "data": image},
+    }
+
+
+def measure(transport_class, transport_format, compression, message, repeat):
+    server = QWebSocketServer("bench", QWebSocketServer.SslMode.NonSecureMode)
+    server.listen(QHostAddress(QHostAddress.SpecialAddress.LocalHost), 0)
+    transports = []
+
+    def on_connection():
+        transport = transport_class(server.nextPendingConnection())
+        transport.format = transport_format
+        transport.compression = compression
+        transport.messageReceived.connect(lambda received, origin: origin.sendMessage(received))
+        transports.append(transport)
+
+    server.newConnection.connect(on_connection)
+
+    loop = QEventLoop()
+    frames = []
+
+    def on_frame(frame):
+        frame = bytes(frame)
+        frames.append(len(frame))
+        if frame.startswith(COMPRESSED_MAGIC):
+            json.loads(zlib.decompress(frame[len(COMPRESSED_MAGIC):]))
+        loop.quit()
+
+    client = QWebSocket()
+    client.connected.connect(loop.quit)
+    client.textMessageReceived.connect(lambda frame: on_frame(frame.encode("utf-8")))
+    client.binaryMessageReceived.connect(on_frame)
+    client.open(QUrl(f"ws://127.0.0.1:{server.serverPort()}"))
+    loop.exec()
+
+    text = json.dumps(message, separators=(",", ":"))
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.sendTextMessage(text)
+        loop.exec()
+        times.append(time.perf_counter() - started)
+
+    client.close()
+    server.close()
+    return statistics.median(times), frames[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50, help="round trips per measurement")
+    args = parser.parse_args()
+
+    modes = (
+        ("indented text", LegacyTransport, FORMAT_TEXT, False),
+        ("compact text", WebSocketTransport, FORMAT_TEXT, False),
+        ("compact binary", WebSocketTransport, FORMAT_BINARY, False),
+        ("compressed", WebSocketTransport, FORMAT_BINARY, True),
+    )
+
+    print(f"{'payload':<14} {'framing':<16} {'median ms':>10} {'bytes':>12}")
+    for name, message in payloads().items():
+        for mode, transport_class, transport_format, compression in modes:
+            latency, size = measure(transport_class, transport_format, compression, message, args.repeat)
+            print(f"{name:<14} {mode:<16} {latency * 1000:>10.3f} {size:>12}")
+
+
+if __name__ == "__main__":
+    main()
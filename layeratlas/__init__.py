@@ -32,6 +32,10 @@ def classFactory(iface):  # pylint: disable=invalid-name
     :type iface: QgsInterface
     """
     #
-    from layeratlas.layer_atlas import LayerAtlas
+    from layeratlas.helper.logging_helper import timed_span
 
-    return LayerAtlas(iface)
+    with timed_span("import layer_atlas"):
+        from layeratlas.layer_atlas import LayerAtlas
+
+    with timed_span("LayerAtlas.__init__"):
+        return LayerAtlas(iface)
@@ -1,7 +1,15 @@
-from layeratlas.helper.logging_helper import setup_logger
+import json
+
+from qgis.core import QgsSettings
+from qgis.PyQt.QtCore import QT_VERSION_STR
+
+from layeratlas.helper.logging_helper import setup_logger, timed_span
 
 logger = setup_logger(__name__)
 
+# Modules providing each class, cached per Qt major version after the first probe
+SETTINGS_BINDINGS = "layeratlas/bindings/qt{major}"
+
 
 def import_from_paths(import_paths, class_name_error=None):
     """Try to import a class from the first available module in the given paths.
@@ -16,60 +24,91 @@ def import_from_paths(import_paths, class_name_error=None):
     Raises:
         ImportError: If none of the import paths succeed
     """
-    for module_name, class_name in import_paths:
-        try:
-            module = __import__(module_name, fromlist=[class_name])
-            class_obj = getattr(module, class_name)
-            logger.info(f"{class_name} : Found in {module_name}")
-            return class_obj
-        except (ImportError, AttributeError):
-            continue
+    with timed_span(f"resolve {class_name_error}"):
+        for module_name, class_name in import_paths:
+            try:
+                module = __import__(module_name, fromlist=[class_name])
+                class_obj = getattr(module, class_name)
+                logger.info(f"{class_name} : Found in {module_name}")
+                return class_obj
+            except (ImportError, AttributeError):
+                continue
     
     logger.critical(f"{class_name_error} : NOT FOUND")
     raise ImportError(f"{class_name_error} : NOT FOUND")
 
 
-"""Import QWebEngineView from the first available library."""
-import_qwebengineview = [
-    ('qgis.gui', 'QgsWebEngineView'),
-    ('qgis.PyQt.QtWebEngineWidgets', 'QWebEngineView'),
-    ('PyQt6.QtWebEngineWidgets', 'QWebEngineView'),
-    ('PyQt5.QtWebEngineWidgets', 'QWebEngineView'),
-]
+"""Candidate modules for each web class, tried in order."""
+IMPORT_PATHS = {
+    "QWebEngineView": [
+        ('qgis.gui', 'QgsWebEngineView'),
+        ('qgis.PyQt.QtWebEngineWidgets', 'QWebEngineView'),
+        ('PyQt6.QtWebEngineWidgets', 'QWebEngineView'),
+        ('PyQt5.QtWebEngineWidgets', 'QWebEngineView'),
+    ],
+    "QWebChannel": [
+        ('PyQt6.QtWebChannel', 'QWebChannel'),
+        ('PyQt5.QtWebChannel', 'QWebChannel'),
+    ],
+    "QWebSocketServer": [
+        ('PyQt6.QtWebSockets', 'QWebSocketServer'),
+        ('PyQt5.QtWebSockets', 'QWebSocketServer'),
+    ],
+    "QHostAddress": [
+        ('PyQt6.QtNetwork', 'QHostAddress'),
+        ('PyQt5.QtNetwork', 'QHostAddress'),
+    ],
+    "QWebChannelAbstractTransport": [
+        ('PyQt6.QtWebChannel', 'QWebChannelAbstractTransport'),
+        ('PyQt5.QtWebChannel', 'QWebChannelAbstractTransport'),
+    ],
+}
+
 
-QWebEngineView = import_from_paths(import_qwebengineview, class_name_error="QWebEngineView")
+def resolve_bindings():
+    """Resolve the web classes, from the modules cached for this Qt version when possible.
 
-"""Import QWebChannel from the first available library."""
-import_qwebchannel = [
-    ('PyQt6.QtWebChannel', 'QWebChannel'),
-    ('PyQt5.QtWebChannel', 'QWebChannel'),
-]
+    The first start probes every candidate with import_from_paths and stores the
+    winning (module, class) of each class in the QGIS settings. Later starts
+    import those directly and only probe again if the cached imports fail.
 
-QWebChannel = import_from_paths(import_qwebchannel, class_name_error="QWebChannel")
+    Returns:
+        dict: The classes by name
 
-"""Import QWebSocketServer from the first available library."""
-import_qwebsocketserver = [
-    ('PyQt6.QtWebSockets', 'QWebSocketServer'),
-    ('PyQt5.QtWebSockets', 'QWebSocketServer'),
-]
+    Raises:
+        ImportError: If a class is not available in any candidate module
+    """
+    settings = QgsSettings()
+    settings_key = SETTINGS_BINDINGS.format(major=QT_VERSION_STR.split(".")[0])
+
+    cached = settings.value(settings_key, "")
+    if cached:
+        try:
+            with timed_span("resolve cached Qt bindings"):
+                classes = {}
+                for name, (module_name, class_name) in json.loads(cached).items():
+                    module = __import__(module_name, fromlist=[class_name])
+                    classes[name] = getattr(module, class_name)
+            if set(classes) == set(IMPORT_PATHS):
+                return classes
+        except (ImportError, AttributeError, ValueError, TypeError) as e:
+            logger.warning(f"Cached Qt bindings are not available anymore, probing again: {e}")
+        settings.remove(settings_key)
 
-QWebSocketServer = import_from_paths(import_qwebsocketserver, class_name_error="QWebSocketServer")
+    classes = {}
+    resolved = {}
+    for name, import_paths in IMPORT_PATHS.items():
+        classes[name] = import_from_paths(import_paths, class_name_error=name)
+        resolved[name] = (classes[name].__module__, classes[name].__name__)
 
-"""Import QHostAddress from the first available library."""
-import_qhostaddress = [
-    ('PyQt6.QtNetwork', 'QHostAddress'),
-    ('PyQt5.QtNetwork', 'QHostAddress'),
-]
-QHostAddress = import_from_paths(import_qhostaddress, class_name_error="QHostAddress")
+    settings.setValue(settings_key, json.dumps(resolved))
+    return classes
 
 
-"""Import QWebChannelAbstractTransport from the first available library."""
-import_qwebchannelabstracttransport = [
-    ('PyQt6.QtWebChannel', 'QWebChannelAbstractTransport'),
-    ('PyQt5.QtWebChannel', 'QWebChannelAbstractTransport'),
-]
+_classes = resolve_bindings()
 
-QWebChannelAbstractTransport = import_from_paths(
-    import_qwebchannelabstracttransport,
-    class_name_error="QWebChannelAbstractTransport"
-)
\ No newline at end of file
+QWebEngineView = _classes["QWebEngineView"]
+QWebChannel = _classes["QWebChannel"]
+QWebSocketServer = _classes["QWebSocketServer"]
+QHostAddress = _classes["QHostAddress"]
+QWebChannelAbstractTransport = _classes["QWebChannelAbstractTransport"]
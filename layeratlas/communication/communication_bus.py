@@ -2,20 +2,26 @@ from __future__ import annotations
 
 import os
 import json
-import tempfile
+import itertools
 from qgis.utils import iface
 
-from qgis.core import QgsApplication, QgsProject, QgsLayerDefinition, QgsSettings
+from qgis.core import QgsApplication, QgsProject, QgsSettings, QgsTask
 from qgis.utils import iface
-from qgis.PyQt.QtCore import QObject, pyqtSignal, pyqtSlot,QByteArray, QBuffer, QIODevice
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot,QByteArray, QBuffer, QIODevice
 from qgis.PyQt.QtGui import QImage, QPainter
 from qgis.PyQt.QtWidgets import QFileDialog, QDialog
 
+from layeratlas.communication.web_socket_transport import current_transport
+from layeratlas.core.async_download_engine import AsyncDownloadEngine, DatasetDownloadTask
+from layeratlas.core.canvas_snapshot import CanvasSnapshotRenderer, DEFAULT_JPEG_QUALITY
 from layeratlas.core.download_file_task import DownloadFileTask
+from layeratlas.core.download_scheduler import DownloadScheduler
+from layeratlas.core.http_session import connection_stats
+from layeratlas.core.layer_definition import load_layer_definitions, parse_layer_definitions
 from layeratlas.helper.logging_helper import setup_logger
 
 logger = setup_logger(__name__)
-from layeratlas.core.load_file import loadFile
+from layeratlas.core.load_file import LayerLoader
 from layeratlas.gui.select_dataset_layers import SelectDatasetLayersDialog
 
 
@@ -28,9 +34,55 @@ class communicationBus(QObject):
         super().__init__()
         self.plugin_version = None
 
+        self.download_scheduler = DownloadScheduler.instance()
+        self.download_scheduler.queueChanged.connect(self.EmitDownloadQueue)
+        self.download_scheduler.progressChanged.connect(self.EmitDownloadProgress)
+
+        self.snapshot_renderer = None
+        if iface and iface.mapCanvas():
+            self.snapshot_renderer = CanvasSnapshotRenderer(iface.mapCanvas(), self)
+        # Transport of the client that requested each pending snapshot
+        self.snapshot_requesters = {}
+
+        # Asynchronous calls, their results are delivered by EmitCallFinished
+        self._call_ids = itertools.count(1)
+        self._call_tasks = {}
+
     # Signal to create a layer
     EmitCreateLayer = pyqtSignal(str)
 
+    # Signal to create many layers at once, carrying a JSON object:
+    # {"layers": [{"id", "name", "group", "definition"}, ...], "duplicates": int}
+    EmitCreateLayers = pyqtSignal(str)
+
+    # Signal carrying the number of layers exported and the total of a bulk upload
+    EmitUploadProgress = pyqtSignal(int, int)
+
+    # Signal carrying the JSON state of the download queue
+    EmitDownloadQueue = pyqtSignal(str)
+
+    # Signal carrying the JSON progress of the downloads, at most 10 times per second:
+    # {"downloads": [{"id", "state", "bytes", "total", "throughput", "eta"}, ...]}
+    # throughput is in bytes per second and eta in seconds, null when unknown
+    EmitDownloadProgress = pyqtSignal(str)
+
+    # Signal carrying the request id and JSON delivery info of a map canvas snapshot
+    EmitMapCanvasImage = pyqtSignal(str, str)
+
+    # Signal carrying the id and the JSON outcome of an asynchronous call:
+    # {"result": ...} when it succeeded, {"error": "..."} otherwise
+    EmitCallFinished = pyqtSignal(str, str)
+
+    def _start_call(self, name):
+        call_id = str(next(self._call_ids))
+        logger.debug(f"Starting asynchronous call {call_id}: {name}")
+        return call_id
+
+    def _finish_call(self, call_id, result=None, error=None):
+        outcome = {"error": error} if error is not None else {"result": result}
+        logger.debug(f"Asynchronous call {call_id} finished: {'failed' if error is not None else 'succeeded'}")
+        self.EmitCallFinished.emit(call_id, json.dumps(outcome))
+
     @pyqtSlot(str, result=bool)
     def addLayerToProject(self, LayerDefinitionXML):
         """
@@ -49,28 +101,58 @@ class communicationBus(QObject):
             return False
             
         try:
-            with tempfile.NamedTemporaryFile(suffix=".qlr", delete=False) as temp_file:
-                temp_file.write(LayerDefinitionXML.encode("utf-8"))
-                temp_file.flush()
-                logger.debug(f"Created temporary layer definition file: {temp_file.name}")
-
-                result = QgsLayerDefinition.loadLayerDefinition(
-                    temp_file.name,
-                    QgsProject.instance(),
-                    QgsProject.instance().layerTreeRoot(),
-                )
-                
-                if not result:
-                    logger.error("Failed to load layer definition into project")
-                    return False
+            if not load_layer_definitions([LayerDefinitionXML]):
+                logger.error("Failed to load layer definition into project")
+                return False
 
-            os.remove(temp_file.name)
-            logger.info("Successfully added layer to project and cleaned up temporary file")
+            logger.info("Successfully added layer to project")
             return True
         except Exception as e:
             logger.error(f"Error adding layer to project: {e}")
             return False
 
+    @pyqtSlot(str, result=int)
+    def addLayersToProject(self, LayerDefinitionsJSON):
+        """
+        Adds several layers to the current QGIS project in a single layer tree update.
+
+        Args:
+            LayerDefinitionsJSON (str): JSON array of layer definition XML strings.
+
+        Returns:
+            int: The number of layer definitions successfully added.
+        """
+        logger.info("Starting to add layers to project")
+
+        try:
+            layer_definitions = json.loads(LayerDefinitionsJSON)
+        except (TypeError, json.JSONDecodeError) as e:
+            logger.error(f"Failed to parse layer definitions JSON: {e}")
+            return 0
+
+        if not isinstance(layer_definitions, list):
+            logger.error("Layer definitions must be a JSON array")
+            return 0
+
+        try:
+            canvas = iface.mapCanvas() if iface else None
+            if canvas:
+                canvas.freeze(True)
+            try:
+                loaded = load_layer_definitions(
+                    [xml for xml in layer_definitions if isinstance(xml, str) and xml.strip()]
+                )
+            finally:
+                if canvas:
+                    canvas.freeze(False)
+                    canvas.refresh()
+
+            logger.info(f"Added {loaded} of {len(layer_definitions)} layer definitions to project")
+            return loaded
+        except Exception as e:
+            logger.error(f"Error adding layers to project: {e}")
+            return 0
+
     @pyqtSlot(str, str, result=bool)
     def downloadDataset(self, requests, dest_folder):
         """
@@ -150,23 +232,97 @@ class communicationBus(QObject):
         else:
             logger.debug(f"Single request found, proceeding with download")
 
-        # Create a download task for each request
+        # Large multi-file datasets are downloaded by the async engine behind a single task
+        engine = AsyncDownloadEngine.instance() if len(requests) >= AsyncDownloadEngine.threshold() else None
+        if engine is not None:
+            logger.info(f"Downloading {len(requests)} files with the async download engine")
+            try:
+                self.download_scheduler.submit(
+                    DatasetDownloadTask(requests, dest_folder, engine),
+                    max(request.get("priority", 0) for request in requests),
+                    on_completed=lambda task: [
+                        LayerLoader.instance().load(
+                            transfer.extracted_path or transfer.dest_path, transfer.file_name
+                        )
+                        for transfer in task.completed
+                    ],
+                )
+                return True
+            except Exception as e:
+                logger.error(f"Error creating the dataset download task: {e}")
+                return False
+
+        # Queue a download task for each request, the first requests get the highest priority
         logger.info(f"Creating {len(requests)} download tasks")
         try:
-            self.tasks = [DownloadFileTask(request, dest_folder) for request in requests]
-            for i, task in enumerate(self.tasks):
-                task.taskCompleted.connect(
-                    lambda task=task: loadFile(task.dest_path, task.file_name)
+            for i, request in enumerate(requests):
+                task = DownloadFileTask(request, dest_folder)
+                priority = request.get("priority", len(requests) - i)
+                self.download_scheduler.submit(
+                    task,
+                    priority,
+                    on_completed=lambda task: LayerLoader.instance().load(
+                        task.extracted_path or task.dest_path, task.file_name
+                    ),
                 )
-                QgsApplication.taskManager().addTask(task)
-                logger.debug(f"Added download task {i+1}/{len(self.tasks)} to task manager")
-            
-            logger.info(f"Successfully initiated {len(self.tasks)} download tasks")
+                logger.debug(f"Queued download task {i+1}/{len(requests)} with priority {priority}")
+
+            logger.info(f"Successfully queued {len(requests)} download tasks")
             return True
         except Exception as e:
             logger.error(f"Error creating download tasks: {e}")
             return False
 
+    @pyqtSlot(result=str)
+    def getDownloadQueue(self):
+        """
+        Retrieves the state of the download queue.
+
+        Returns:
+            str: JSON string with the limits and the state of each download.
+        """
+        return json.dumps(self.download_scheduler.state())
+
+    @pyqtSlot(result=str)
+    def getConnectionStats(self):
+        """
+        Retrieves the keep-alive statistics of the HTTP connection pool used by the downloads.
+
+        Returns:
+            str: JSON string with the backend in use and its statistics, e.g. the requests sent,
+                 the connections opened and their reuse ratio.
+        """
+        return json.dumps(connection_stats())
+
+    @pyqtSlot(int, int, result=bool)
+    def setDownloadPriority(self, download_id, priority):
+        """
+        Changes the priority of a download still waiting in the queue.
+
+        Args:
+            download_id (int): The id of the download in the queue state.
+            priority (int): The new priority, higher priorities start first.
+
+        Returns:
+            bool: True if the download was still queued.
+        """
+        logger.info(f"Setting priority of download {download_id} to {priority}")
+        return self.download_scheduler.set_priority(download_id, priority)
+
+    @pyqtSlot(int, result=bool)
+    def cancelDownload(self, download_id):
+        """
+        Cancels a queued or running download.
+
+        Args:
+            download_id (int): The id of the download in the queue state.
+
+        Returns:
+            bool: True if the download was found and canceled.
+        """
+        logger.info(f"Canceling download {download_id}")
+        return self.download_scheduler.cancel(download_id)
+
     @pyqtSlot(result=str)
     def getMapCanvasImage(self):
         """
@@ -182,6 +338,15 @@ class communicationBus(QObject):
                 logger.error("QGIS interface or map canvas is not available")
                 return ""
             
+            # An unchanged canvas returns the image encoded by the previous call
+            snapshot_key = None
+            if self.snapshot_renderer is not None:
+                snapshot_key = self.snapshot_renderer.snapshot_key(quality=-1)
+                cached = self.snapshot_renderer.cached(snapshot_key)
+                if cached is not None:
+                    logger.debug("Map canvas unchanged, returning the cached image")
+                    return cached.toBase64().data().decode("utf-8")
+
             canvas_size = iface.mapCanvas().size()
             logger.debug(f"Map canvas size: {canvas_size.width()}x{canvas_size.height()}")
             
@@ -209,7 +374,10 @@ class communicationBus(QObject):
             if not image.save(buffer, "JPEG"):
                 logger.error("Failed to save image to buffer")
                 return ""
-                
+
+            if snapshot_key is not None:
+                self.snapshot_renderer.remember(snapshot_key, byte_array)
+
             base64_data = byte_array.toBase64().data().decode("utf-8")
             logger.debug(f"Successfully converted map canvas to base64 (length: {len(base64_data)} characters)")
             
@@ -218,6 +386,164 @@ class communicationBus(QObject):
             logger.error(f"Error capturing map canvas image: {e}")
             return ""
 
+    @pyqtSlot(int, int, int, result=str)
+    def requestMapCanvasImage(self, width, height, quality):
+        """
+        Starts rendering a JPEG snapshot of the map canvas without blocking QGIS.
+
+        The result is announced by EmitMapCanvasImage(request_id, info) where info is a JSON
+        string: {"delivery": "binary"} when the image was sent as a binary payload frame,
+        {"delivery": "base64", "data": ...} for clients without binary payloads, or
+        {"error": ...} if the snapshot failed.
+
+        Args:
+            width (int): Width of the image in pixels, 0 to use the canvas size.
+            height (int): Height of the image in pixels, 0 to keep the canvas aspect ratio.
+            quality (int): JPEG quality from 0 to 100, -1 for the default quality.
+
+        Returns:
+            str: The id of the snapshot request, empty if the canvas is not available.
+        """
+        logger.info(f"Requesting map canvas snapshot {width}x{height} (quality {quality})")
+
+        if self.snapshot_renderer is None:
+            logger.error("QGIS interface or map canvas is not available")
+            return ""
+
+        if quality < 0:
+            quality = DEFAULT_JPEG_QUALITY
+
+        try:
+            request_id = self.snapshot_renderer.request(width, height, min(quality, 100))
+        except Exception as e:
+            logger.error(f"Error requesting map canvas snapshot: {e}")
+            return ""
+
+        # The binary payload only goes to the client that asked for it
+        self.snapshot_requesters[request_id] = current_transport()
+        return request_id
+
+    @pyqtSlot(str, result=str)
+    def addLayerToProjectAsync(self, LayerDefinitionXML):
+        """
+        Starts adding a layer to the project without blocking QGIS, the XML being parsed in a background task.
+
+        The outcome is delivered by EmitCallFinished(call_id, outcome), the result being
+        True if the layer was added.
+
+        Args:
+            LayerDefinitionXML (str): The XML string defining the layer to be added.
+
+        Returns:
+            str: The id of the call.
+        """
+        call_id = self._start_call("addLayerToProject")
+        if not LayerDefinitionXML or not LayerDefinitionXML.strip():
+            QTimer.singleShot(0, lambda: self._finish_call(call_id, error="Layer definition is empty"))
+            return call_id
+
+        self._load_layer_definitions_async(call_id, [LayerDefinitionXML], lambda loaded: loaded == 1)
+        return call_id
+
+    @pyqtSlot(str, result=str)
+    def addLayersToProjectAsync(self, LayerDefinitionsJSON):
+        """
+        Starts adding several layers to the project without blocking QGIS, the XML being parsed in a background task.
+
+        The outcome is delivered by EmitCallFinished(call_id, outcome), the result being
+        the number of layer definitions added.
+
+        Args:
+            LayerDefinitionsJSON (str): JSON array of layer definition XML strings.
+
+        Returns:
+            str: The id of the call.
+        """
+        call_id = self._start_call("addLayersToProject")
+        try:
+            layer_definitions = json.loads(LayerDefinitionsJSON)
+            if not isinstance(layer_definitions, list):
+                raise ValueError("Layer definitions must be a JSON array")
+        except (TypeError, ValueError) as e:
+            logger.error(f"Failed to parse layer definitions JSON: {e}")
+            # The except variable is deleted when the block ends, bind the message for the deferred call
+            message = str(e)
+            QTimer.singleShot(0, lambda: self._finish_call(call_id, error=message))
+            return call_id
+
+        self._load_layer_definitions_async(
+            call_id, [xml for xml in layer_definitions if isinstance(xml, str) and xml.strip()], lambda loaded: loaded
+        )
+        return call_id
+
+    def _load_layer_definitions_async(self, call_id, xml_definitions, result):
+        def on_finished(exception, documents=None):
+            self._call_tasks.pop(call_id, None)
+            if exception is not None:
+                logger.error(f"Failed to parse layer definitions: {exception}")
+                self._finish_call(call_id, error="Failed to parse the layer definitions")
+                return
+            # QgsTask.fromFunction leaves out empty results, no valid definition is not an error
+            try:
+                self._finish_call(call_id, result=result(load_layer_definitions(documents or [])))
+            except Exception as e:
+                logger.error(f"Error adding layers to project: {e}")
+                self._finish_call(call_id, error=str(e))
+
+        task = QgsTask.fromFunction(
+            "Parsing Layer Atlas layer definitions",
+            parse_layer_definitions,
+            xml_definitions,
+            on_finished=on_finished,
+            flags=QgsTask.Silent,
+        )
+        self._call_tasks[call_id] = task
+        QgsApplication.taskManager().addTask(task)
+
+    @pyqtSlot(str, str, result=str)
+    def downloadDatasetAsync(self, requests, dest_folder):
+        """
+        Starts downloadDataset once the call returned, so its folder and layer dialogs do not block the web page.
+
+        The outcome is delivered by EmitCallFinished(call_id, outcome), the result being
+        True if the downloads were queued.
+
+        Args:
+            requests (str): JSON string of requests to download.
+            dest_folder (str): The destination folder where the file will be saved.
+
+        Returns:
+            str: The id of the call.
+        """
+        call_id = self._start_call("downloadDataset")
+        QTimer.singleShot(0, lambda: self._finish_call(call_id, result=self.downloadDataset(requests, dest_folder)))
+        return call_id
+
+    @pyqtSlot(result=str)
+    def getMapCanvasImageAsync(self):
+        """
+        Starts capturing the map canvas without blocking QGIS, rendered and encoded in the background.
+
+        The outcome is delivered by EmitCallFinished(call_id, outcome), the result being
+        the Base64 encoded JPEG image of the map canvas.
+
+        Returns:
+            str: The id of the call.
+        """
+        call_id = self._start_call("getMapCanvasImage")
+        if self.snapshot_renderer is None:
+            QTimer.singleShot(0, lambda: self._finish_call(call_id, error="The map canvas is not available"))
+            return call_id
+
+        def on_snapshot(data, error):
+            if error is not None:
+                self._finish_call(call_id, error=error)
+            else:
+                self._finish_call(call_id, result=data.toBase64().data().decode("utf-8"))
+
+        self.snapshot_renderer.request(callback=on_snapshot)
+        return call_id
+
     @pyqtSlot(str, result=str)
     def getQgsSetting(self, key):
         """
@@ -1,21 +1,34 @@
-import os
-from qgis.core import QgsMapLayerType, QgsLayerDefinition
-from qgis.PyQt.QtCore import Qt
+import json
+from qgis.core import QgsLayerTree, QgsSettings
+from qgis.PyQt.QtCore import Qt, QTimer
+from layeratlas.communication import QWebEngineView
+from layeratlas.core.layer_definition import BulkLayerExport, export_layer_definition
 from layeratlas.helper.logging_helper import setup_logger
 
 
 logger = setup_logger(__name__)
 
+# QWebChannel message type sent by the page when it subscribes to a signal
+CONNECT_TO_SIGNAL_MESSAGE = 7
+
+# Upload a selection of several layers, or including groups, as one batch of layer definitions
+SETTINGS_BULK_UPLOAD = "layeratlas/upload/bulk"
+# Include the layers of the groups selected in a bulk upload
+SETTINGS_UPLOAD_GROUPS = "layeratlas/upload/includeGroups"
+
 
 class WebEngineView(QWebEngineView):
     def __init__(self, _iface):
         super().__init__()
         self.iface = _iface
+        self.client_ready = False
+        self.pending_layer_definitions = []
+        self.bulk_exports = []
 
         self.setAcceptDrops(True)
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.NoContextMenu)
 
-        from layeratlas.communication import QWebEngineView, QWebChannel, QWebSocketServer, QHostAddress
+        from layeratlas.communication import QWebChannel, QWebSocketServer, QHostAddress
         from layeratlas.communication.web_socket_client_wrapper import WebSocketClientWrapper
         from layeratlas.communication.communication_bus import communicationBus
 
@@ -33,6 +46,7 @@ class WebEngineView(QWebEngineView):
         self.client_wrapper = WebSocketClientWrapper(self.server)
         self.channel = QWebChannel()
         self.client_wrapper.client_connected.connect(self.channel.connectTo)
+        self.client_wrapper.client_connected.connect(self._on_client_connected)
         logger.debug("QWebChannel initialized and connected to WebSocket client wrapper")
 
         # setup the communicationBus and publish it to the QWebChannel
@@ -40,6 +54,67 @@ class WebEngineView(QWebEngineView):
         self.channel.registerObject("communicationBus", self.communication_bus)
         logger.info("Communication bus registered with QWebChannel")
 
+        if self.communication_bus.snapshot_renderer is not None:
+            self.communication_bus.snapshot_renderer.snapshotReady.connect(self._deliver_snapshot)
+            self.communication_bus.snapshot_renderer.snapshotFailed.connect(self._snapshot_failed)
+
+
+    def _on_client_connected(self, transport):
+        self.client_ready = False
+        transport.messageReceived.connect(self._on_client_message)
+
+    def _on_client_message(self, message, transport):
+        """Flush the layers uploaded before the page subscribed to the communication bus signals."""
+        if self.client_ready:
+            return
+
+        message_type = message.get("type")
+        if hasattr(message_type, "toInt"):
+            message_type = message_type.toInt()
+        if message_type == CONNECT_TO_SIGNAL_MESSAGE:
+            self.client_ready = True
+            # Let the QWebChannel register the subscription before emitting
+            QTimer.singleShot(0, self._flush_layer_definitions)
+
+    def _flush_layer_definitions(self):
+        pending, self.pending_layer_definitions = self.pending_layer_definitions, []
+        if pending:
+            logger.debug(f"Sending {len(pending)} layer definition message(s) queued while the page was loading")
+        for signal, payload in pending:
+            signal.emit(payload)
+
+    def _emit_when_ready(self, signal, payload):
+        if self.client_ready:
+            signal.emit(payload)
+        else:
+            logger.debug("Web page not connected yet, queuing layer definition")
+            self.pending_layer_definitions.append((signal, payload))
+
+    def send_layer_definition(self, layer_definition_xml):
+        """Send a layer definition to the page, or queue it until the page is connected."""
+        self._emit_when_ready(self.communication_bus.EmitCreateLayer, layer_definition_xml)
+
+    def send_layer_definitions(self, layers, duplicates=0):
+        """Send many exported layers to the page in one message, or queue it until the page is connected."""
+        message = json.dumps({"layers": layers, "duplicates": duplicates})
+        self._emit_when_ready(self.communication_bus.EmitCreateLayers, message)
+
+    def _deliver_snapshot(self, request_id, data):
+        """Send a map snapshot as a binary payload to the client that requested it, or as base64 to other clients."""
+        requester = self.communication_bus.snapshot_requesters.pop(request_id, None)
+        # The requester may have disconnected while the snapshot was rendering
+        if requester in self.client_wrapper.transports() and requester.binary_payloads:
+            header = {"kind": "snapshot", "id": request_id, "mimeType": "image/jpeg"}
+            requester.send_payload(header, data)
+            info = {"delivery": "binary"}
+        else:
+            info = {"delivery": "base64", "data": data.toBase64().data().decode("utf-8")}
+
+        self.communication_bus.EmitMapCanvasImage.emit(request_id, json.dumps(info))
+
+    def _snapshot_failed(self, request_id, error):
+        self.communication_bus.snapshot_requesters.pop(request_id, None)
+        self.communication_bus.EmitMapCanvasImage.emit(request_id, json.dumps({"error": error}))
 
     def dragEnterEvent(self, event):
         logger.debug(f"Drag enter event - MIME types: {[fmt for fmt in event.mimeData().formats()]}")
@@ -59,22 +134,60 @@ class WebEngineView(QWebEngineView):
 
 
     def add_layer_to_layer_atlas(self):
+        """Send the layers and groups selected in the layer tree to the page as one layer definition."""
         layerTreeView = self.iface.layerTreeView()
         selectedNodes = layerTreeView.selectedNodes()
         if not selectedNodes:
             logger.warning("No layers selected for adding to Layer Atlas")
             return
-        
-        logger.info(f"Adding layer '{selectedNodes[0].name()}' to Layer Atlas")
-        temp_file_path = "temp.qlr"
-        QgsLayerDefinition.exportLayerDefinition(temp_file_path, [selectedNodes[0]])
-        try:
-            with open(temp_file_path, "r") as file:
-                layer_definition_xml = file.read()
-                self.communication_bus.EmitCreateLayer.emit(layer_definition_xml)
-            os.remove(temp_file_path)
-            logger.debug("Layer definition successfully sent to communication bus")
-        except Exception as e:
-            logger.error(f"Failed to process layer definition: {e}")
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+
+        settings = QgsSettings()
+        if (
+            settings.value(SETTINGS_BULK_UPLOAD, True, type=bool)
+            and self.page_handles_bulk_upload()
+            and (len(selectedNodes) > 1 or any(QgsLayerTree.isGroup(node) for node in selectedNodes))
+        ):
+            self.upload_layers(selectedNodes, settings.value(SETTINGS_UPLOAD_GROUPS, True, type=bool))
+            return
+
+        logger.info(f"Adding {len(selectedNodes)} selected node(s) to Layer Atlas")
+        layer_definition_xml = export_layer_definition(selectedNodes)
+        if layer_definition_xml is None:
+            logger.error("Failed to export the selected layers")
+            return
+
+        self.send_layer_definition(layer_definition_xml)
+        logger.debug("Layer definition successfully sent to communication bus")
+
+    def page_handles_bulk_upload(self) -> bool:
+        """Whether the connected page announced it handles EmitCreateLayers batches."""
+        client_wrapper = getattr(self, "client_wrapper", None)
+        if client_wrapper is None:
+            return False
+        return any(transport.create_layers for transport in client_wrapper.transports())
+
+    def upload_layers(self, nodes, include_groups=True):
+        """
+        Send layers to the page as one batch of layer definitions, one per distinct data source.
+
+        Progress is reported by the EmitUploadProgress signal while the layers are exported.
+
+        Args:
+            nodes (list): The layer tree nodes to upload.
+            include_groups (bool): Whether the layers of the groups in nodes are uploaded.
+        """
+        export = BulkLayerExport(nodes, include_groups, self)
+        export.progressChanged.connect(self.communication_bus.EmitUploadProgress)
+        export.finished.connect(lambda layers: self._bulk_export_finished(export, layers))
+        self.bulk_exports.append(export)
+        export.start()
+
+    def _bulk_export_finished(self, export, layers):
+        self.bulk_exports.remove(export)
+        export.deleteLater()
+        if not layers:
+            logger.warning("No layers to upload to Layer Atlas")
+            return
+
+        logger.info(f"Sending {len(layers)} layer(s) to Layer Atlas")
+        self.send_layer_definitions(layers, export.duplicates)
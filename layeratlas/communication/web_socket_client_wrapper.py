@@ -27,4 +27,9 @@ class WebSocketClientWrapper(QObject):
         socket = self._server.nextPendingConnection()
         transport = WebSocketTransport(socket)
         self._transports.append(transport)
-        self.client_connected.emit(transport)
\ No newline at end of file
+        socket.disconnected.connect(lambda transport=transport: self._transports.remove(transport))
+        self.client_connected.emit(transport)
+
+    def transports(self):
+        """Return the transports of the connected clients."""
+        return list(self._transports)
\ No newline at end of file
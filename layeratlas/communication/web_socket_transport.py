@@ -1,8 +1,67 @@
 from __future__ import annotations
 
+import json
+import zlib
+import struct
 
-from qgis.PyQt.QtCore import QByteArray, QJsonDocument, pyqtSlot
+from qgis.core import QgsSettings
+from qgis.PyQt.QtCore import QByteArray, QJsonDocument, QTimer, pyqtSlot
 from layeratlas.communication import QWebChannelAbstractTransport
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# Key of the handshake message the web client sends to negotiate the framing:
+#   {"layeratlasTransport": {"formats": ["binary", "text"], "features": ["batch", "deflate"]}}
+# The transport answers with the chosen format and the features it enabled:
+#   {"layeratlasTransport": {"format": "binary", "features": ["batch"]}}
+TRANSPORT_KEY = "layeratlasTransport"
+
+# Compact JSON sent as text frames, understood by any QWebChannel client
+FORMAT_TEXT = "text"
+# Compact UTF-8 JSON sent as binary frames, without the bytes to str conversion
+FORMAT_BINARY = "binary"
+
+SUPPORTED_FORMATS = [FORMAT_BINARY, FORMAT_TEXT]
+
+# Messages sent within the batch window are grouped in one frame:
+#   {"layeratlasBatch": [message, message, ...]}
+FEATURE_BATCH = "batch"
+BATCH_KEY = "layeratlasBatch"
+# Raw binary payloads (e.g. map snapshots) sent outside the WebChannel protocol as
+#   PAYLOAD_MAGIC | header length (uint32, big endian) | JSON header | data
+FEATURE_PAYLOAD = "payload"
+PAYLOAD_MAGIC = b"LAP1"
+
+# Frames larger than the compression threshold are sent zlib compressed, in both directions, as
+#   COMPRESSED_MAGIC | zlib stream of the UTF-8 JSON frame
+FEATURE_DEFLATE = "deflate"
+COMPRESSED_MAGIC = b"LAZ1"
+# Fastest level, compresses layer definitions nearly as well as the default level in a third of the time
+COMPRESSION_LEVEL = 1
+
+# The page handles the EmitCreateLayers batches of bulk layer uploads
+FEATURE_CREATE_LAYERS = "createLayers"
+
+SUPPORTED_FEATURES = [FEATURE_BATCH, FEATURE_PAYLOAD, FEATURE_DEFLATE, FEATURE_CREATE_LAYERS]
+
+# Batch window in milliseconds, 0 groups the messages sent in the same event loop iteration
+SETTINGS_BATCH_WINDOW = "layeratlas/transport/batchWindow"
+# Minimum size in bytes of a frame to compress it, 0 disables compression
+SETTINGS_COMPRESSION_THRESHOLD = "layeratlas/transport/compressionThreshold"
+DEFAULT_COMPRESSION_THRESHOLD = 16 * 1024
+
+# QWebChannel property update messages, their data lists can be merged
+PROPERTY_UPDATE_MESSAGE = 2
+
+# Transport whose message is being handled, the QWebChannel invokes the slots while it is emitted
+_receiving = None
+
+
+def current_transport():
+    """Return the transport of the client whose call is being handled, None outside a call."""
+    return _receiving
+
 
 class WebSocketTransport(QWebChannelAbstractTransport):
     """QWebChannelAbstractSocket implementation using a QWebSocket internally.
@@ -17,7 +76,23 @@ class WebSocketTransport(QWebChannelAbstractTransport):
            The socket is also set as the parent of the transport object."""
         super().__init__(socket)
         self._socket = socket
+        self.format = FORMAT_TEXT
+        self.batching = False
+        self.binary_payloads = False
+        self.compression = False
+        self.create_layers = False
+        self.compression_threshold = QgsSettings().value(
+            SETTINGS_COMPRESSION_THRESHOLD, DEFAULT_COMPRESSION_THRESHOLD, type=int
+        )
+
+        self._outgoing = []
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(QgsSettings().value(SETTINGS_BATCH_WINDOW, 0, type=int))
+        self._flush_timer.timeout.connect(self.flush)
+
         self._socket.textMessageReceived.connect(self.text_message_received)
+        self._socket.binaryMessageReceived.connect(self.binary_message_received)
         self._socket.disconnected.connect(self._disconnected)
 
     def __del__(self):
@@ -28,18 +103,78 @@ class WebSocketTransport(QWebChannelAbstractTransport):
         self.deleteLater()
 
     def sendMessage(self, message):
-        """Serialize the JSON message and send it as a text message via the
-           WebSocket to the client."""
-        doc = QJsonDocument(message)
-        json_bytes = doc.toJson()
-        json_message = bytes(json_bytes).decode("utf-8")
-        self._socket.sendTextMessage(json_message)
+        """Serialize the JSON message as compact JSON and send it to the client,
+           or queue it for the next batch if the client negotiated batching."""
+        if not self.batching:
+            self._send(self._serialize(message))
+            return
+
+        self._outgoing.append(message)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """Send the queued messages, in a single batch frame if there are several."""
+        messages = coalesce_property_updates(self._outgoing)
+        self._outgoing = []
+        if not messages:
+            return
+
+        if len(messages) == 1:
+            self._send(self._serialize(messages[0]))
+            return
+
+        parts = [bytes(self._serialize(message)) for message in messages]
+        batch = b'{"' + BATCH_KEY.encode("utf-8") + b'":[' + b",".join(parts) + b"]}"
+        self._send(QByteArray(batch))
+
+    def send_payload(self, header, data):
+        """Send raw bytes in a binary frame, described by a JSON header.
+
+        Args:
+            header (dict): Description of the payload, e.g. {"kind": "snapshot", "id": "1"}.
+            data (QByteArray): The payload.
+        """
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        frame = QByteArray(PAYLOAD_MAGIC + struct.pack(">I", len(header_bytes)) + header_bytes)
+        frame.append(data)
+        self._socket.sendBinaryMessage(frame)
+
+    def _serialize(self, message):
+        return QJsonDocument(message).toJson(QJsonDocument.JsonFormat.Compact)
+
+    def _send(self, json_bytes):
+        """Send serialized JSON in a binary frame if the client negotiated it, as text otherwise.
+           Large frames are compressed if the client negotiated it."""
+        if self.compression and 0 < self.compression_threshold <= json_bytes.size():
+            compressed = zlib.compress(bytes(json_bytes), COMPRESSION_LEVEL)
+            if len(compressed) + len(COMPRESSED_MAGIC) < json_bytes.size():
+                self._socket.sendBinaryMessage(QByteArray(COMPRESSED_MAGIC + compressed))
+                return
+
+        if self.format == FORMAT_BINARY:
+            self._socket.sendBinaryMessage(json_bytes)
+        else:
+            self._socket.sendTextMessage(bytes(json_bytes).decode("utf-8"))
 
     @pyqtSlot(str)
     def text_message_received(self, message_data_in):
         """Deserialize the stringified JSON messageData and emit
            messageReceived."""
-        message_data = QByteArray(bytes(message_data_in, encoding='utf8'))
+        self._message_received(QByteArray(bytes(message_data_in, encoding='utf8')))
+
+    @pyqtSlot(QByteArray)
+    def binary_message_received(self, message_data):
+        """Deserialize the UTF-8 JSON messageData, decompressing it if needed, and emit messageReceived."""
+        if message_data.startsWith(COMPRESSED_MAGIC):
+            try:
+                message_data = QByteArray(zlib.decompress(bytes(message_data)[len(COMPRESSED_MAGIC):]))
+            except zlib.error as e:
+                logger.warning(f"Failed to decompress binary message: {e}")
+                return
+        self._message_received(message_data)
+
+    def _message_received(self, message_data):
         message = QJsonDocument.fromJson(message_data)
         if message.isNull():
             print("Failed to parse text message as JSON object:", message_data)
@@ -47,4 +182,76 @@ class WebSocketTransport(QWebChannelAbstractTransport):
         if not message.isObject():
             print("Received JSON message that is not an object: ", message_data)
             return
-        self.messageReceived.emit(message.object(), self)
\ No newline at end of file
+
+        message_object = message.object()
+        if TRANSPORT_KEY in message_object:
+            self._negotiate(message_object[TRANSPORT_KEY])
+            return
+        global _receiving
+        previous, _receiving = _receiving, self
+        try:
+            self.messageReceived.emit(message_object, self)
+        finally:
+            _receiving = previous
+
+    def _negotiate(self, request):
+        """Pick the first framing format offered by the client that the transport supports."""
+        if hasattr(request, "toVariant"):
+            request = request.toVariant()
+        offered = (request or {}).get("formats") or []
+        features = [
+            feature for feature in (request or {}).get("features") or [] if feature in SUPPORTED_FEATURES
+        ]
+
+        self.flush()
+        self.format = next(
+            (candidate for candidate in offered if candidate in SUPPORTED_FORMATS), FORMAT_TEXT
+        )
+        self.batching = FEATURE_BATCH in features
+        self.binary_payloads = FEATURE_PAYLOAD in features
+        self.compression = FEATURE_DEFLATE in features
+        self.create_layers = FEATURE_CREATE_LAYERS in features
+
+        # The answer is always a text frame, the client switches after reading it
+        reply = QJsonDocument({TRANSPORT_KEY: {"format": self.format, "features": features}})
+        self._socket.sendTextMessage(
+            bytes(reply.toJson(QJsonDocument.JsonFormat.Compact)).decode("utf-8")
+        )
+
+
+def coalesce_property_updates(messages):
+    """Merge consecutive QWebChannel property update messages into one.
+
+    Args:
+        messages (list): Outgoing messages in send order.
+
+    Returns:
+        list: The messages, each run of property updates replaced by a single update
+    """
+    coalesced = []
+    for message in messages:
+        previous = coalesced[-1] if coalesced else None
+        if (
+            previous is not None
+            and _message_type(message) == PROPERTY_UPDATE_MESSAGE
+            and _message_type(previous) == PROPERTY_UPDATE_MESSAGE
+        ):
+            merged = dict(previous)
+            merged["data"] = _to_list(previous["data"]) + _to_list(message["data"])
+            coalesced[-1] = merged
+        else:
+            coalesced.append(message)
+    return coalesced
+
+
+def _message_type(message):
+    message_type = message.get("type")
+    if hasattr(message_type, "toInt"):
+        return message_type.toInt()
+    return message_type
+
+
+def _to_list(value):
+    if hasattr(value, "toArray"):
+        return list(value.toArray())
+    return list(value)
@@ -0,0 +1,330 @@
+import os
+import queue
+import shutil
+import tarfile
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.core import QgsSettings
+
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# Extract downloaded archives next to them before loading, instead of reading them through GDAL's /vsizip/
+SETTINGS_EXTRACT_ARCHIVES = "layeratlas/download/extractArchives"
+
+ZIP = "zip"
+TAR = "tar"
+ARCHIVE_EXTENSIONS = {
+    ".zip": ZIP,
+    ".tar": TAR,
+    ".tar.gz": TAR,
+    ".tgz": TAR,
+    ".tar.bz2": TAR,
+    ".tbz2": TAR,
+    ".tar.xz": TAR,
+    ".txz": TAR,
+}
+
+# Chunks queued between the download and the streaming extraction thread, bounds the memory used
+STREAM_QUEUE_SIZE = 64
+
+# Zip members are inflated by this many threads, zlib releases the GIL
+MAX_EXTRACT_WORKERS = 4
+
+
+class ArchiveExtractionError(Exception):
+    """Raised when an archive is corrupt or contains unsafe member paths."""
+
+
+def archive_format(file_name):
+    """
+    Identifies an archive from its file name.
+
+    Args:
+        file_name (str): The name of the downloaded file.
+
+    Returns:
+        str: ZIP, TAR or None if the file is not a supported archive
+    """
+    name = file_name.lower()
+    for extension, kind in ARCHIVE_EXTENSIONS.items():
+        if name.endswith(extension):
+            return kind
+    return None
+
+
+def should_extract(request, file_name) -> bool:
+    """Returns True if the downloaded file is an archive to extract, per request or setting."""
+    if archive_format(file_name) is None:
+        return False
+    extract = request.get("extract")
+    if extract is None:
+        extract = QgsSettings().value(SETTINGS_EXTRACT_ARCHIVES, False, type=bool)
+    return bool(extract)
+
+
+def extraction_folder(archive_path) -> str:
+    """Returns the folder an archive is extracted to: next to it, named after it without extension."""
+    folder, name = os.path.split(archive_path)
+    lower = name.lower()
+    for extension in ARCHIVE_EXTENSIONS:
+        if lower.endswith(extension):
+            name = name[: -len(extension)]
+            break
+    return os.path.join(folder, name).replace("\\", "/")
+
+
+def safe_member_path(target, member_name) -> str:
+    """
+    Resolves the destination of an archive member inside the extraction folder.
+
+    Raises:
+        ArchiveExtractionError: If the member would be written outside the folder
+    """
+    path = os.path.realpath(os.path.join(target, member_name))
+    root = os.path.realpath(target)
+    if os.path.commonpath([root, path]) != root:
+        raise ArchiveExtractionError(f"Archive member outside the extraction folder: {member_name}")
+    return path
+
+
+def extract_archive(archive_path, target, should_stop=None) -> bool:
+    """
+    Extracts a downloaded archive, the members of zip files in parallel.
+
+    Args:
+        archive_path (str): The path of the archive.
+        target (str): The folder to extract to.
+        should_stop (callable): Checked between members, stops the extraction when it returns True.
+
+    Returns:
+        bool: True if the archive was fully extracted
+    """
+    kind = archive_format(archive_path)
+    if kind is None:
+        logger.error(f"Unsupported archive format: {archive_path}")
+        return False
+
+    try:
+        if kind == ZIP:
+            extracted = extract_zip(archive_path, target, should_stop)
+        else:
+            with tarfile.open(archive_path, mode="r:*") as archive:
+                extracted = extract_tar_members(archive, target, should_stop)
+    except Exception as e:
+        # Corrupt members also raise zlib, bz2 or lzma errors, and paths on other drives ValueError
+        logger.error(f"Failed to extract {archive_path}: {e}")
+        extracted = False
+
+    # A partial folder would be taken for a complete extraction by the next download
+    if not extracted:
+        shutil.rmtree(target, ignore_errors=True)
+    return extracted
+
+
+def extract_zip(archive_path, target, should_stop=None) -> bool:
+    """Extracts a zip archive, its members spread over threads each reading its own handle."""
+    # Members are keyed by destination, the last one wins like a sequential extraction
+    paths = {}
+    with zipfile.ZipFile(archive_path) as archive:
+        for member in archive.infolist():
+            path = safe_member_path(target, member.filename)
+            if member.is_dir():
+                os.makedirs(path, exist_ok=True)
+            else:
+                paths[path] = member
+
+    # Folders are created before the threads start, creating shared parents concurrently races
+    for path in paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Largest members first, so one big file does not finish alone at the end
+    members = sorted(paths.items(), key=lambda item: item[1].file_size, reverse=True)
+    workers = max(1, min(MAX_EXTRACT_WORKERS, len(members), os.cpu_count() or 1))
+    shares = [members[index::workers] for index in range(workers)]
+
+    def extract_share(share):
+        with zipfile.ZipFile(archive_path) as archive:
+            for path, member in share:
+                if should_stop is not None and should_stop():
+                    return False
+                with archive.open(member) as source, open(path, "wb") as file:
+                    shutil.copyfileobj(source, file, 1024 * 1024)
+        return True
+
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(extract_share, shares))
+
+    logger.info(f"Extracted {len(members)} file(s) from {archive_path} with {workers} thread(s)")
+    return all(results)
+
+
+def extract_tar_members(archive, target, should_stop=None) -> bool:
+    """
+    Extracts the regular files and folders of an opened tar archive, in stream order.
+
+    Links and special files are skipped, member paths are checked to stay inside the target.
+    """
+    count = 0
+    for member in archive:
+        if should_stop is not None and should_stop():
+            return False
+        if not (member.isfile() or member.isdir()):
+            logger.debug(f"Skipping tar member {member.name}: not a regular file")
+            continue
+
+        path = safe_member_path(target, member.name)
+        if member.isdir():
+            os.makedirs(path, exist_ok=True)
+            continue
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        source = archive.extractfile(member)
+        with source, open(path, "wb") as file:
+            shutil.copyfileobj(source, file, 1024 * 1024)
+        count += 1
+
+    logger.info(f"Extracted {count} file(s) to {target}")
+    return True
+
+
+def stream_ended(archive) -> bool:
+    """
+    Returns True if a tar archive opened as a stream was read up to its end-of-archive
+    marker and, when compressed, up to the end of the compressed stream.
+
+    tarfile stops iterating silently when a stream is cut between two members.
+    """
+    # Only the zero block of the marker is read whole without yielding a member,
+    # a cut stream leaves an empty or short header read
+    if archive.fileobj.tell() < archive.offset + tarfile.BLOCKSIZE:
+        return False
+
+    # Decompress what follows the marker, up to the end of the compressed stream
+    while archive.fileobj.read(1024 * 1024):
+        pass
+    decompressor = getattr(archive.fileobj, "cmp", None)
+    return decompressor is None or decompressor.eof
+
+
+class TeeWriter:
+    """Writes to a file and hands the same bytes to a second writer, to extract a download while saving it."""
+
+    def __init__(self, file, write):
+        self.file = file
+        self._write = write
+
+    def write(self, data):
+        self.file.write(data)
+        self._write(data)
+
+
+class StreamingTarExtractor:
+    """
+    Extracts a tar archive (optionally gzip, bzip2 or xz compressed) from the bytes of a
+    download while they arrive, so the archive is never read back from disk.
+
+    The download calls write() with each chunk, a background thread decompresses and
+    writes the members as the stream progresses.
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.error = None
+        self.completed = False
+        self.received = 0
+        self._chunks = queue.Queue(STREAM_QUEUE_SIZE)
+        self._current = b""
+        self._offset = 0
+        self._ended = False
+        self._aborted = threading.Event()
+        # Set when the extraction thread exits and no longer reads the queue
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._extract, name="LayerAtlasTarExtractor", daemon=True)
+        self._thread.start()
+
+    def write(self, data):
+        """Queues a chunk of the archive, blocking while the extraction lags too far behind."""
+        # Once the extraction failed the download goes on, only the archive file is written
+        if self._stopped.is_set():
+            return
+        self.received += len(data)
+        self._put(bytes(data))
+
+    def close(self, expected_size=None) -> bool:
+        """
+        Signals the end of the archive and waits for the extraction to finish.
+
+        Args:
+            expected_size (int): Size of the archive announced by the server, None if unknown.
+
+        Returns:
+            bool: True if the archive was fully extracted
+        """
+        self._put(None)
+        self._thread.join()
+        if self.completed and expected_size and self.received != expected_size:
+            self.error = f"received {self.received} of {expected_size} bytes"
+            self.completed = False
+        if not self.completed:
+            logger.error(f"Failed to extract the archive stream to {self.target}: {self.error}")
+            shutil.rmtree(self.target, ignore_errors=True)
+        return self.completed
+
+    def abort(self):
+        """Stops the extraction and removes the extracted files."""
+        self._aborted.set()
+        self._put(None)
+        self._thread.join()
+        shutil.rmtree(self.target, ignore_errors=True)
+
+    def _put(self, chunk):
+        # A stopped extraction thread no longer reads, never block the download on it
+        while not self._stopped.is_set():
+            try:
+                self._chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, size=-1):
+        """File-like read used by tarfile in the extraction thread."""
+        parts = []
+        needed = size
+        while needed != 0 and not self._ended:
+            if self._offset >= len(self._current):
+                chunk = self._chunks.get()
+                if chunk is None:
+                    self._ended = True
+                    break
+                self._current, self._offset = chunk, 0
+
+            available = len(self._current) - self._offset
+            take = available if needed < 0 else min(available, needed)
+            parts.append(self._current[self._offset:self._offset + take])
+            self._offset += take
+            if needed > 0:
+                needed -= take
+        return b"".join(parts)
+
+    def _extract(self):
+        try:
+            os.makedirs(self.target, exist_ok=True)
+            with tarfile.open(fileobj=self, mode="r|*") as archive:
+                self.completed = extract_tar_members(archive, self.target, self._aborted.is_set)
+                if self.completed and not stream_ended(archive):
+                    self.error = "the archive stream is truncated"
+                    self.completed = False
+            # Consume what follows the end of archive marker so the download is never blocked
+            while not self._ended:
+                self.read(1024 * 1024)
+        except Exception as e:
+            # Corrupt streams also raise zlib, bz2 or lzma errors, and paths on other drives ValueError
+            self.error = e
+            self.completed = False
+        finally:
+            # Whatever stopped the thread, release the download writing to the queue
+            self._stopped.set()
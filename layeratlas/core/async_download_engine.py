@@ -0,0 +1,324 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import wait
+from urllib.parse import urlparse
+
+from qgis.core import QgsSettings, QgsTask
+
+from layeratlas.core.archive_extraction import extract_archive, extraction_folder, should_extract
+from layeratlas.core.download_file_task import content_disposition_filename
+from layeratlas.core.download_io import MAX_CHUNK_SIZE, ProgressThrottle
+from layeratlas.core.download_journal import PART_SUFFIX
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# httpx is not shipped with QGIS, the engine is only used when it is installed, h2 adds HTTP/2
+try:
+    import httpx
+except ImportError:
+    httpx = None
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# Download datasets of at least ASYNC_THRESHOLD files with the engine, when httpx is installed
+SETTINGS_ASYNC_ENGINE = "layeratlas/download/asyncEngine"
+SETTINGS_ASYNC_THRESHOLD = "layeratlas/download/asyncThreshold"
+ASYNC_THRESHOLD = 8
+
+# Transfers running at once in the engine, in total and per host
+MAX_TRANSFERS = 64
+MAX_TRANSFERS_PER_HOST = 16
+SETTINGS_MAX_TRANSFERS = "layeratlas/download/asyncMaxTransfers"
+SETTINGS_MAX_TRANSFERS_PER_HOST = "layeratlas/download/asyncMaxTransfersPerHost"
+
+# Connection attempts retried by the httpx transport
+CONNECT_RETRIES = 4
+
+# Interval at which the facade task refreshes its progress
+PROGRESS_POLL_INTERVAL = 0.1  # seconds
+
+
+class Transfer:
+    """A file downloaded by the AsyncDownloadEngine, its counters read from other threads."""
+
+    def __init__(self, request, dest_folder, claimed=None):
+        self.request = request
+        self.url = request["url"]
+        self.dest_folder = dest_folder
+        self.file_name = None
+        self.dest_path = None
+        self.extracted_path = None
+        self.total_size = 0
+        self.downloaded_size = 0
+        self.succeeded = False
+        self.error = None
+        self.canceled = threading.Event()
+        # Destination paths taken by the transfers of the same dataset, only used on the engine thread
+        self.claimed = claimed if claimed is not None else set()
+
+    def cancel(self):
+        self.canceled.set()
+
+    def extract(self):
+        """Extracts the downloaded file next to it if it is an archive to extract, see should_extract."""
+        if not should_extract(self.request, self.file_name):
+            return
+        folder = extraction_folder(self.dest_path)
+        if os.path.isdir(folder) or extract_archive(self.dest_path, folder, self.canceled.is_set):
+            self.extracted_path = folder
+
+
+class AsyncDownloadEngine:
+    """
+    Downloads many files concurrently from a single background thread running an asyncio event loop.
+
+    Where a DownloadFileTask holds a worker thread of the QGIS task manager
+    for each file, mostly sleeping on socket reads, the engine multiplexes
+    hundreds of transfers over non-blocking sockets in one thread, with an
+    httpx.AsyncClient (HTTP/2 when h2 is installed). Transfers are limited
+    globally and per host with semaphores.
+
+    The engine only streams files to disk: byte ranges, resume and the dataset
+    cache stay with DownloadFileTask, which remains the path for large files.
+    """
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """Returns the plugin-wide engine, None if it is disabled or httpx is not installed."""
+        if cls._instance is None:
+            settings = QgsSettings()
+            if httpx is None or not settings.value(SETTINGS_ASYNC_ENGINE, True, type=bool):
+                return None
+            cls._instance = cls(
+                settings.value(SETTINGS_MAX_TRANSFERS, MAX_TRANSFERS, type=int),
+                settings.value(SETTINGS_MAX_TRANSFERS_PER_HOST, MAX_TRANSFERS_PER_HOST, type=int),
+            )
+        return cls._instance
+
+    @classmethod
+    def threshold(cls) -> int:
+        """Returns the number of files from which a dataset is downloaded with the engine."""
+        return QgsSettings().value(SETTINGS_ASYNC_THRESHOLD, ASYNC_THRESHOLD, type=int)
+
+    def __init__(self, max_transfers=MAX_TRANSFERS, max_per_host=MAX_TRANSFERS_PER_HOST):
+        self.max_transfers = max(1, max_transfers)
+        self.max_per_host = max(1, min(max_per_host, self.max_transfers))
+
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self.stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="LayerAtlasDownloadEngine", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        logger.info(
+            f"Download engine started: {self.max_transfers} transfers, {self.max_per_host} per host, "
+            f"HTTP/2 {'enabled' if HTTP2 else 'unavailable'}"
+        )
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._transfers = asyncio.Semaphore(self.max_transfers)
+        self._per_host = {}
+        self._writing = set()
+        self._client = httpx.AsyncClient(
+            http2=HTTP2,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_transfers),
+            transport=httpx.AsyncHTTPTransport(http2=HTTP2, retries=CONNECT_RETRIES),
+        )
+        self._started.set()
+
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._client.aclose())
+        self._loop.close()
+
+    def submit(self, transfer: Transfer):
+        """
+        Schedules a transfer on the engine thread.
+
+        Returns:
+            concurrent.futures.Future: Resolves to True once the file is downloaded
+        """
+        return asyncio.run_coroutine_threadsafe(self._download(transfer), self._loop)
+
+    def shutdown(self):
+        """Cancels the transfers still running and stops the engine thread."""
+        self.stopped.set()
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_transfers(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Failed to cancel the running transfers: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        AsyncDownloadEngine._instance = None
+
+    async def _cancel_transfers(self):
+        # Cancelling the tasks resolves the futures returned by submit, nothing waits on them forever
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _claim(self, transfer: Transfer, file_name):
+        """
+        Returns the file name and destination path of a transfer, the name suffixed when
+        another transfer of the dataset or a file being written already uses the path.
+        """
+        stem, extension = os.path.splitext(file_name)
+        if stem.lower().endswith(".tar"):
+            stem, extension = stem[:-4], stem[-4:] + extension
+
+        name, index = file_name, 1
+        while True:
+            path = os.path.normpath(os.path.join(transfer.dest_folder, name)).replace("\\", "/")
+            if path not in transfer.claimed and path not in self._writing:
+                break
+            name = f"{stem} ({index}){extension}"
+            index += 1
+
+        transfer.claimed.add(path)
+        return name, path
+
+    async def _download(self, transfer: Transfer) -> bool:
+        host = urlparse(transfer.url).hostname or ""
+        if host not in self._per_host:
+            self._per_host[host] = asyncio.Semaphore(self.max_per_host)
+
+        async with self._transfers, self._per_host[host]:
+            if transfer.canceled.is_set():
+                return False
+            try:
+                transfer.succeeded = await self._stream(transfer)
+            except (httpx.HTTPError, OSError) as e:
+                transfer.error = str(e)
+                logger.error(f"Failed to download {transfer.url}: {e}")
+            finally:
+                part_path = f"{transfer.dest_path}{PART_SUFFIX}"
+                if not transfer.succeeded and transfer.dest_path in self._writing and os.path.exists(part_path):
+                    os.remove(part_path)
+                self._writing.discard(transfer.dest_path)
+            return transfer.succeeded
+
+    async def _stream(self, transfer: Transfer) -> bool:
+        request = transfer.request
+        async with self._client.stream(
+            "GET",
+            transfer.url,
+            headers=request.get("headers"),
+            params=request.get("params"),
+            timeout=request.get("timeout", 10),
+        ) as response:
+            response.raise_for_status()
+
+            # Two files of a dataset may have the same name, each gets its own path
+            transfer.file_name, transfer.dest_path = self._claim(
+                transfer,
+                content_disposition_filename(response.headers.get("content-disposition"))
+                or os.path.basename(urlparse(transfer.url).path),
+            )
+
+            if os.path.exists(transfer.dest_path):
+                logger.info(f"Skipping download - File already exists: {transfer.dest_path}")
+                return True
+
+            try:
+                transfer.total_size = int(response.headers.get("content-length", 0))
+            except ValueError:
+                transfer.total_size = 0
+
+            # Local disk writes are short enough not to stall the other transfers of the loop
+            self._writing.add(transfer.dest_path)
+            with open(transfer.dest_path + PART_SUFFIX, "wb") as file:
+                async for chunk in response.aiter_bytes(MAX_CHUNK_SIZE):
+                    if transfer.canceled.is_set():
+                        return False
+                    file.write(chunk)
+                    transfer.downloaded_size += len(chunk)
+
+        os.replace(transfer.dest_path + PART_SUFFIX, transfer.dest_path)
+        logger.info(f"File downloaded successfully: {transfer.dest_path}")
+        return True
+
+
+class DatasetDownloadTask(QgsTask):
+    """
+    A single QgsTask standing for all the files of a dataset downloaded by the AsyncDownloadEngine.
+
+    It holds one task manager thread while waiting for the transfers and reports
+    their aggregate progress. Like DownloadFileTask it exposes request,
+    downloaded_size and total_size, so the DownloadScheduler can queue it and
+    report its progress.
+    """
+
+    def __init__(self, requests, dest_folder, engine: AsyncDownloadEngine):
+        super().__init__(f"Downloading {len(requests)} files", QgsTask.CanCancel)
+        self.engine = engine
+        claimed = set()
+        self.transfers = [Transfer(request, dest_folder, claimed) for request in requests]
+        self.completed = []
+
+        first = requests[0]
+        self.request = {
+            "url": first["url"],
+            "name": f"{first.get('name') or first['url']} and {len(requests) - 1} other file(s)",
+        }
+        self._progress = ProgressThrottle(self.setProgress)
+
+    @property
+    def downloaded_size(self) -> int:
+        return sum(transfer.downloaded_size for transfer in self.transfers)
+
+    @property
+    def total_size(self) -> int:
+        return sum(transfer.total_size for transfer in self.transfers)
+
+    def run(self):
+        if self.engine.stopped.is_set():
+            return False
+
+        futures = {self.engine.submit(transfer): transfer for transfer in self.transfers}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=PROGRESS_POLL_INTERVAL)
+            if self.isCanceled():
+                for transfer in self.transfers:
+                    transfer.cancel()
+            # The engine was shut down, its transfers will not complete
+            if self.engine.stopped.is_set():
+                break
+
+            # Archives are extracted in this thread while the engine downloads the other files
+            for future in done:
+                transfer = futures[future]
+                if transfer.succeeded and not self.isCanceled():
+                    transfer.extract()
+
+            finished = len(futures) - len(pending)
+            total = self.total_size
+            # Until every size is known, count the files rather than the bytes
+            if total and all(transfer.total_size or transfer.succeeded for transfer in self.transfers):
+                self._progress.update(100 * self.downloaded_size / total)
+            else:
+                self._progress.update(100 * finished / len(futures))
+
+        self.completed = [transfer for transfer in self.transfers if transfer.succeeded]
+        failed = len(self.transfers) - len(self.completed)
+        if failed:
+            logger.warning(f"{failed} of {len(self.transfers)} file(s) failed to download")
+        return bool(self.completed) and not self.isCanceled() and not self.engine.stopped.is_set()
+
+    def cancel(self):
+        for transfer in self.transfers:
+            transfer.cancel()
+        super().cancel()
+
+    def finished(self, result):
+        if result:
+            logger.info(f"Downloaded {len(self.completed)} of {len(self.transfers)} file(s)")
@@ -0,0 +1,229 @@
+import itertools
+from collections import OrderedDict
+
+from qgis.core import QgsApplication, QgsMapRendererParallelJob, QgsTask
+from qgis.PyQt.QtCore import QObject, QByteArray, QBuffer, QIODevice, QSize, Qt, QTimer, pyqtSignal
+
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_JPEG_QUALITY = 80
+
+# Number of encoded snapshots kept for identical requests on an unchanged canvas
+MAX_CACHED_SNAPSHOTS = 16
+
+
+class CanvasSnapshotRenderer(QObject):
+    """
+    Renders snapshots of the map canvas asynchronously.
+
+    The map is rendered by a QgsMapRendererParallelJob, which draws the layers in
+    worker threads, and the image is encoded to JPEG in a QgsTask, so the GUI
+    thread is never blocked by a snapshot.
+
+    Snapshots no larger than the canvas reuse the layer images already rendered
+    by the canvas (its QgsMapRendererCache) and are scaled down afterwards, and
+    encoded snapshots are kept until the canvas is refreshed again.
+    """
+
+    # Request id and JPEG data of a finished snapshot
+    snapshotReady = pyqtSignal(str, QByteArray)
+    # Request id and error message of a failed snapshot
+    snapshotFailed = pyqtSignal(str, str)
+
+    def __init__(self, map_canvas, parent=None):
+        super().__init__(parent)
+        self.map_canvas = map_canvas
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._tasks = {}
+        self._callbacks = {}
+
+        # Bumped on every canvas refresh, so cached snapshots of a changed map are never reused
+        self._generation = 0
+        self._snapshots = OrderedDict()
+        self.map_canvas.mapCanvasRefreshed.connect(self._invalidate)
+
+    def request(self, width=0, height=0, quality=DEFAULT_JPEG_QUALITY, callback=None) -> str:
+        """
+        Starts rendering a snapshot of the current canvas extent.
+
+        Args:
+            width (int): Width of the image in pixels, 0 to use the canvas size.
+            height (int): Height of the image in pixels, 0 to keep the canvas aspect ratio.
+            quality (int): JPEG quality from 0 to 100.
+            callback (callable): Called with (data, error) instead of emitting snapshotReady / snapshotFailed.
+
+        Returns:
+            str: The id identifying the snapshot in snapshotReady / snapshotFailed
+        """
+        request_id = str(next(self._ids))
+        if callback is not None:
+            self._callbacks[request_id] = callback
+
+        settings = self.map_canvas.mapSettings()
+        canvas_size = settings.outputSize()
+        size = snapshot_size(canvas_size, width, height)
+
+        key = self._snapshot_key(settings, size, quality)
+        data = self.cached(key)
+        if data is not None:
+            logger.debug(f"Canvas snapshot {request_id} served from the snapshot cache")
+            QTimer.singleShot(0, lambda: self._ready(request_id, data))
+            return request_id
+
+        # Render at the canvas size to hit the layer images cached by the canvas, then scale down
+        cache = self.map_canvas.cache()
+        reuse_canvas_cache = (
+            cache is not None
+            and not self.map_canvas.isDrawing()
+            and size.width() <= canvas_size.width()
+            and size.height() <= canvas_size.height()
+        )
+        if not reuse_canvas_cache:
+            settings.setOutputSize(size)
+
+        job = QgsMapRendererParallelJob(settings)
+        if reuse_canvas_cache:
+            job.setCache(cache)
+        job.finished.connect(lambda: self._on_rendered(request_id, size, quality, key))
+        self._jobs[request_id] = job
+        job.start()
+
+        logger.debug(
+            f"Rendering canvas snapshot {request_id} at {size.width()}x{size.height()}"
+            f" ({'reusing' if reuse_canvas_cache else 'without'} the canvas cache)"
+        )
+        return request_id
+
+    def snapshot_key(self, width=0, height=0, quality=DEFAULT_JPEG_QUALITY) -> tuple:
+        """
+        Builds the key of a snapshot of the current canvas in the snapshot cache.
+
+        The key hashes the extent, CRS and layer set of the canvas, and a generation bumped
+        by every canvas refresh so style or data changes invalidate it as well.
+
+        Args:
+            width (int): Width of the image in pixels, 0 to use the canvas size.
+            height (int): Height of the image in pixels, 0 to keep the canvas aspect ratio.
+            quality (int): JPEG quality from 0 to 100.
+
+        Returns:
+            tuple: The cache key
+        """
+        settings = self.map_canvas.mapSettings()
+        return self._snapshot_key(settings, snapshot_size(settings.outputSize(), width, height), quality)
+
+    def cached(self, key):
+        """Returns the JPEG data cached for a snapshot key, or None."""
+        data = self._snapshots.get(key)
+        if data is not None:
+            self._snapshots.move_to_end(key)
+        return data
+
+    def remember(self, key, data):
+        """Caches the JPEG data of a snapshot, unless the canvas was refreshed since the key was built."""
+        if key[0] != self._generation:
+            return
+        self._snapshots[key] = data
+        while len(self._snapshots) > MAX_CACHED_SNAPSHOTS:
+            self._snapshots.popitem(last=False)
+
+    def _invalidate(self):
+        self._generation += 1
+        self._snapshots.clear()
+
+    def _snapshot_key(self, settings, size, quality):
+        return (
+            self._generation,
+            settings.extent().toString(),
+            settings.destinationCrs().authid(),
+            tuple(layer.id() for layer in settings.layers()),
+            size.width(),
+            size.height(),
+            quality,
+        )
+
+    def _on_rendered(self, request_id, size, quality, key):
+        job = self._jobs.pop(request_id)
+        image = job.renderedImage()
+        if image.isNull():
+            self._failed(request_id, "Failed to render the map canvas")
+            return
+
+        task = QgsTask.fromFunction(
+            f"Encoding map snapshot {request_id}",
+            encode_jpeg,
+            image,
+            quality,
+            size,
+            on_finished=lambda exception, data=None: self._on_encoded(request_id, key, exception, data),
+            flags=QgsTask.Silent,
+        )
+        self._tasks[request_id] = task
+        QgsApplication.taskManager().addTask(task)
+
+    def _on_encoded(self, request_id, key, exception, data):
+        self._tasks.pop(request_id, None)
+        if exception is not None or data is None:
+            logger.error(f"Failed to encode canvas snapshot {request_id}: {exception}")
+            self._failed(request_id, "Failed to encode the map canvas image")
+            return
+
+        self.remember(key, data)
+        logger.debug(f"Canvas snapshot {request_id} ready ({data.size()} bytes)")
+        self._ready(request_id, data)
+
+    def _ready(self, request_id, data):
+        callback = self._callbacks.pop(request_id, None)
+        if callback is not None:
+            callback(data, None)
+        else:
+            self.snapshotReady.emit(request_id, data)
+
+    def _failed(self, request_id, error):
+        callback = self._callbacks.pop(request_id, None)
+        if callback is not None:
+            callback(None, error)
+        else:
+            self.snapshotFailed.emit(request_id, error)
+
+
+def snapshot_size(canvas_size, width=0, height=0) -> QSize:
+    """
+    Computes the output size of a snapshot, keeping the canvas aspect ratio for a missing dimension.
+
+    Args:
+        canvas_size (QSize): The size of the canvas.
+        width (int): The requested width, 0 if not specified.
+        height (int): The requested height, 0 if not specified.
+
+    Returns:
+        QSize: The size of the image to render
+    """
+    if width <= 0 and height <= 0:
+        return QSize(canvas_size)
+
+    ratio = canvas_size.height() / max(1, canvas_size.width())
+    if width <= 0:
+        width = round(height / ratio) if ratio else height
+    if height <= 0:
+        height = round(width * ratio)
+    return QSize(max(1, width), max(1, height))
+
+
+def encode_jpeg(task, image, quality, size=None) -> QByteArray:
+    """Scales an image to the given size if needed and encodes it to JPEG, run in a QgsTask."""
+    if size is not None and image.size() != size:
+        image = image.scaled(
+            size, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
+        )
+
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if not image.save(buffer, "JPEG", quality):
+        raise RuntimeError("QImage.save failed")
+    buffer.close()
+    return data
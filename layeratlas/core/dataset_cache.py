@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from qgis.core import QgsApplication, QgsSettings
+
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# Opt-in: caching hashes and copies every finished download, a second pass over each file
+SETTINGS_ENABLED = "layeratlas/cache/enabled"
+SETTINGS_MAX_SIZE_MB = "layeratlas/cache/maxSizeMB"
+SETTINGS_USE_HARDLINKS = "layeratlas/cache/useHardlinks"
+DEFAULT_MAX_SIZE_MB = 5 * 1024
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Suffix of the temporary files of a restore, distinct from the ".part" file of a resumable download
+RESTORE_SUFFIX = ".cache-tmp"
+FICLONE = 0x40049409  # Linux ioctl cloning a file on copy-on-write filesystems
+
+
+class DatasetCache:
+    """
+    Plugin-wide on-disk cache of downloaded files, shared across projects.
+
+    Entries are keyed by URL and query parameters and remember the validators
+    (ETag, Last-Modified) sent by the server, so a cached file can be revalidated
+    with a conditional GET. File contents are stored once per SHA-256 hash and
+    the least recently used entries are evicted when the cache exceeds its size cap.
+    """
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """
+        Returns the plugin-wide cache, or None if it is disabled in the settings.
+        """
+        settings = QgsSettings()
+        if not settings.value(SETTINGS_ENABLED, False, type=bool):
+            return None
+
+        if cls._instance is None:
+            root = os.path.join(QgsApplication.qgisSettingsDirPath(), "layeratlas", "cache")
+            max_size = settings.value(SETTINGS_MAX_SIZE_MB, DEFAULT_MAX_SIZE_MB, type=int)
+            use_hardlinks = settings.value(SETTINGS_USE_HARDLINKS, False, type=bool)
+            cls._instance = cls(root, max_size * 1024 * 1024, use_hardlinks)
+        return cls._instance
+
+    def __init__(self, root, max_size, use_hardlinks=False):
+        self.root = root
+        self.max_size = max_size
+        # Hard links share the data with the project copy: editing a GeoPackage
+        # in place would then alter the cached file, so they are opt-in
+        self.use_hardlinks = use_hardlinks
+
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        self._entries = self._load_index()
+
+    @staticmethod
+    def key(url, params=None) -> str:
+        """
+        Computes the cache key of a request.
+
+        Args:
+            url (str): The URL of the file.
+            params (dict): The query parameters sent with the request.
+
+        Returns:
+            str: The cache key
+        """
+        payload = json.dumps([url, params or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        """
+        Finds a cache entry whose stored file is still intact.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            dict: The entry, or None on a cache miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            blob_path = self._blob_path(entry["sha256"])
+            try:
+                stat = os.stat(blob_path)
+            except OSError:
+                stat = None
+
+            if stat is None or stat.st_size != entry["size"] or stat.st_mtime != entry["mtime"]:
+                logger.info(f"Dropping cache entry with missing or modified data: {entry['file_name']}")
+                del self._entries[key]
+                self._save_index()
+                return None
+
+            return dict(entry)
+
+    def conditional_headers(self, entry) -> dict:
+        """Returns the headers revalidating a cache entry with a conditional GET."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, key):
+        """Marks an entry as recently used."""
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]["last_access"] = time.time()
+                self._save_index()
+
+    def store(self, key, path, file_name, etag=None, last_modified=None):
+        """
+        Adds a downloaded file to the cache.
+
+        Args:
+            key (str): The cache key of the request.
+            path (str): Path of the downloaded file.
+            file_name (str): Name of the file as sent by the server.
+            etag (str): ETag validator of the response.
+            last_modified (str): Last-Modified validator of the response.
+
+        Returns:
+            dict: The new entry, or None if the file could not be cached.
+        """
+        size = os.path.getsize(path)
+        if size > self.max_size:
+            logger.debug(f"Not caching {file_name}: larger than the cache ({size} bytes)")
+            return None
+
+        try:
+            digest = file_sha256(path)
+            blob_path = self._blob_path(digest)
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                # Tasks downloading the same content store it concurrently, each through its own file
+                temp_path = unique_temp_path(os.path.dirname(blob_path), digest, ".tmp")
+                try:
+                    self._link_or_copy(path, temp_path)
+                    os.replace(temp_path, blob_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+        except OSError as e:
+            logger.warning(f"Failed to add {file_name} to the dataset cache: {e}")
+            return None
+
+        entry = {
+            "url_key": key,
+            "file_name": file_name,
+            "sha256": digest,
+            "size": size,
+            "mtime": os.stat(blob_path).st_mtime,
+            "etag": etag,
+            "last_modified": last_modified,
+            "last_access": time.time(),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._evict()
+            self._save_index()
+
+        logger.info(f"Added {file_name} to the dataset cache ({size} bytes)")
+        return dict(entry)
+
+    def materialize(self, entry, dest_path) -> bool:
+        """
+        Places the cached file at the destination path.
+
+        The file is cloned (reflink) when the filesystem supports it, hard linked
+        if enabled in the settings, and copied otherwise.
+
+        Returns:
+            bool: True if the destination file was created
+        """
+        temp_path = None
+        try:
+            temp_path = unique_temp_path(os.path.dirname(dest_path), os.path.basename(dest_path), RESTORE_SUFFIX)
+            self._link_or_copy(self._blob_path(entry["sha256"]), temp_path)
+            os.replace(temp_path, dest_path)
+        except OSError as e:
+            logger.warning(f"Failed to copy {entry['file_name']} from the dataset cache: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+        logger.info(f"Restored from the dataset cache: {dest_path}")
+        return True
+
+    def _link_or_copy(self, src, dst):
+        if os.path.exists(dst):
+            os.remove(dst)
+        if reflink(src, dst):
+            return
+        if self.use_hardlinks:
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(src, dst)
+
+    def _blob_path(self, digest) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache fits its size cap."""
+        blob_sizes = {entry["sha256"]: entry["size"] for entry in self._entries.values()}
+        total_size = sum(blob_sizes.values())
+
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1]["last_access"]):
+            if total_size <= self.max_size:
+                break
+
+            del self._entries[key]
+            if any(other["sha256"] == entry["sha256"] for other in self._entries.values()):
+                continue
+
+            total_size -= entry["size"]
+            try:
+                os.remove(self._blob_path(entry["sha256"]))
+            except OSError:
+                pass
+            logger.debug(f"Evicted {entry['file_name']} from the dataset cache")
+
+    def _load_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable dataset cache index: {e}")
+            return {}
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file)
+        os.replace(temp_path, self.index_path)
+
+
+def unique_temp_path(folder, prefix, suffix) -> str:
+    """Returns the path of a new empty file with a unique name in the folder."""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix=f"{prefix}.", dir=folder or None)
+    os.close(fd)
+    return path
+
+
+def file_sha256(path) -> str:
+    """Returns the hex SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def reflink(src, dst) -> bool:
+    """
+    Clones a file on copy-on-write filesystems (Btrfs, XFS) without copying its data.
+
+    Returns:
+        bool: True if the clone was created
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    try:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
@@ -1,36 +1,61 @@
 import os
 import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util import Retry
 from urllib.parse import urlparse
 
 from qgis.core import QgsTask
 
+from layeratlas.core.archive_extraction import (
+    TAR,
+    StreamingTarExtractor,
+    TeeWriter,
+    archive_format,
+    extract_archive,
+    extraction_folder,
+    should_extract,
+)
+from layeratlas.core.dataset_cache import DatasetCache
+from layeratlas.core.download_io import ProgressThrottle, stream_response
+from layeratlas.core.download_journal import DownloadJournal, PART_SUFFIX
+from layeratlas.core.http_session import CONNECTIONS_PER_DOWNLOAD, connection_stats, get_session
 from layeratlas.helper.logging_helper import setup_logger
 
 logger = setup_logger(__name__)
 
-# Define the retry strategy
-retry_strategy = Retry(
-    total=4,  # Maximum number of retries
-    backoff_factor=2,  # Exponential backoff factor
-    status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
+# Files at least this large are split into byte ranges fetched concurrently
+# when the server advertises "Accept-Ranges: bytes"
+SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+MAX_SEGMENTS = CONNECTIONS_PER_DOWNLOAD
+
+# Ranges interrupted mid-stream are resumed from the last written byte
+RESUMABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
 )
+MAX_RESUME_ATTEMPTS = 3
+RESUME_BACKOFF = 2  # seconds, multiplied by the attempt number
+
+# Bytes written between two saves of the download journal
+JOURNAL_CHECKPOINT_SIZE = 4 * 1024 * 1024
+
 
-# Create an HTTP adapter with the retry strategy and mount it to session
-adapter = HTTPAdapter(max_retries=retry_strategy)
-session = requests.Session()
-session.mount("http://", adapter)
-session.mount("https://", adapter)
+class RangeRequestRejected(requests.exceptions.RequestException):
+    """Raised when the server ignores a Range header and sends the full body."""
 
 
 class DownloadFileTask(QgsTask):
-    def __init__(self, request, dest_folder, chunk_size=1024):
+    def __init__(self, request, dest_folder, chunk_size=None, max_segments=MAX_SEGMENTS):
         super().__init__("Download File:", QgsTask.CanCancel)
         self.file_name = None
         self.dest_folder = dest_folder
         self.dest_path = ""
+        self.extract = False
+        self.extracted_path = None
 
         self.request = request
 
@@ -39,9 +64,34 @@ class DownloadFileTask(QgsTask):
         self.downloaded_size = 0
         self.timeout = request.get("timeout", 10)
 
+        self.accept_ranges = False
+        self.etag = None
+        self.last_modified = None
+        self.max_segments = max(1, int(request.get("segments", max_segments)))
+        self.journal = None
+
+        self.cache = DatasetCache.instance()
+        self.cache_key = DatasetCache.key(request["url"], request.get("params"))
+
+        self._progress_lock = threading.Lock()
+        self._progress = ProgressThrottle(self.setProgress)
+        self._abort_segments = threading.Event()
+
     def run(self):
-        # Try to parse response header
-        self.parse_response_header()
+        cached = self.cache.lookup(self.cache_key) if self.cache else None
+
+        # The headers of the GET response give the filename, size and range support,
+        # so no separate HEAD request is needed
+        try:
+            response = self.open_response(cached)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred during download: {e}")
+            return False
+
+        if response is None:
+            self.file_name = cached["file_name"]
+        else:
+            self.parse_response_header(response)
 
         # If could not get filename from header, use the last part of the URL
         if not self.file_name:
@@ -53,15 +103,146 @@ class DownloadFileTask(QgsTask):
         ).replace("\\", "/")
 
         self.setDescription(f"Downloading File: {self.file_name}")
+        self.extract = should_extract(self.request, self.file_name)
+
+        # The cached copy is still valid (304 Not Modified)
+        if response is None:
+            return self.restore_from_cache(cached) and self.extract_downloaded()
 
         # Check if the file already exists
-        if os.path.exists(self.dest_path):
+        if os.path.exists(self.dest_path) and cached is None:
+            response.close()
             logger.info(f"Skipping download - File already exists: {self.dest_path}")
-            return True
+            return self.extract_downloaded()
 
         # Download the file
         try:
-            response = session.get(
+            downloaded = None
+            if self.accept_ranges and self.total_size:
+                try:
+                    downloaded = self.download_ranges(self.open_journal(), response)
+                except RangeRequestRejected as e:
+                    logger.info(f"Falling back to single stream download: {e}")
+                    self.journal.discard()
+                    self.journal = None
+                    self.downloaded_size = 0
+                    response = None
+
+            if downloaded is None:
+                downloaded = self.download_single_stream(response)
+
+            if downloaded and self.cache:
+                self.cache.store(
+                    self.cache_key, self.dest_path, self.file_name, self.etag, self.last_modified
+                )
+            return downloaded and self.extract_downloaded()
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred during download: {e}")
+            return False
+
+    def open_response(self, cached=None):
+        """
+        Sends the GET request of the file, conditional if a cached copy exists.
+
+        Args:
+            cached (dict): The dataset cache entry of the request, if any.
+
+        Returns:
+            requests.Response: The streamed response, or None if the cached copy
+            is still valid (304 Not Modified).
+        """
+        headers = dict(self.request["headers"] or {})
+        if cached is not None:
+            headers.update(self.cache.conditional_headers(cached))
+
+        response = get_session().get(
+            self.request["url"],
+            stream=True,
+            headers=headers,
+            params=self.request["params"],
+            timeout=self.timeout,
+        )
+        if cached is not None and response.status_code == 304:
+            response.close()
+            return None
+
+        response.raise_for_status()
+        if cached is not None:
+            logger.info(f"Cached copy of {cached['file_name']} is stale, downloading it again")
+        return response
+
+    def restore_from_cache(self, cached) -> bool:
+        """
+        Places a revalidated cached file at the destination path.
+
+        Returns:
+            bool: True if the destination file is up to date
+        """
+        self.cache.touch(self.cache_key)
+        if os.path.exists(self.dest_path) and os.path.getsize(self.dest_path) == cached["size"]:
+            logger.info(f"Skipping download - File is up to date: {self.dest_path}")
+            return True
+
+        restored = self.cache.materialize(cached, self.dest_path)
+        if restored:
+            self.setProgress(100)
+        return restored
+
+    def open_journal(self) -> DownloadJournal:
+        """
+        Loads the journal of a previous attempt if it describes the same remote file,
+        otherwise starts a new one with freshly split byte ranges.
+
+        Returns:
+            DownloadJournal: The journal driving the ranged download
+        """
+        url = self.request["url"]
+        journal = DownloadJournal.load(self.dest_path)
+        if journal is not None:
+            if journal.matches(url, self.total_size, self.etag, self.last_modified):
+                logger.info(
+                    f"Resuming download of {self.file_name} at {journal.bytes_completed}/{self.total_size} bytes"
+                )
+                self.journal = journal
+                self.downloaded_size = journal.bytes_completed
+                return journal
+
+            logger.info(f"Remote file changed since last attempt, restarting: {self.file_name}")
+            journal.discard()
+
+        segments = 1
+        if self.max_segments > 1 and self.total_size >= SEGMENT_MIN_SIZE:
+            segments = self.max_segments
+
+        journal = DownloadJournal(
+            self.dest_path, url, self.total_size, self.etag, self.last_modified
+        )
+        journal.ranges = [
+            [start, end, 0] for start, end in split_byte_ranges(self.total_size, segments)
+        ]
+
+        # Pre-allocate the file so every range can write at its own offset
+        with open(journal.part_path, "wb") as file:
+            file.truncate(self.total_size)
+        journal.save()
+
+        self.journal = journal
+        return journal
+
+    def download_single_stream(self, response=None) -> bool:
+        """
+        Downloads the file over a single connection.
+
+        Args:
+            response (requests.Response): An already opened streamed response to read from.
+
+        Returns:
+            bool: True if the file was downloaded successfully
+        """
+        part_path = self.dest_path + PART_SUFFIX
+        if response is None:
+            response = get_session().get(
                 self.request["url"],
                 stream=True,
                 headers=self.request["headers"],
@@ -70,25 +251,245 @@ class DownloadFileTask(QgsTask):
             )
             response.raise_for_status()
 
-            with open(self.dest_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=self.chunk_size):
-                    if self.isCanceled():
-                        return False
-                    if chunk:
-                        file.write(chunk)
-                        self.downloaded_size += len(chunk)
-                        if self.total_size:
-                            progress = (self.downloaded_size / self.total_size) * 100
-                            self.setProgress(progress)
+        # Tar archives are extracted from the stream while it is written to disk
+        extractor = None
+        folder = extraction_folder(self.dest_path)
+        if self.extract and archive_format(self.file_name) == TAR and not os.path.isdir(folder):
+            extractor = StreamingTarExtractor(folder)
 
-            logger.info(f"File downloaded successfully: {self.dest_path}")
+        try:
+            with open(part_path, "wb") as file:
+                stream_response(
+                    response,
+                    file if extractor is None else TeeWriter(file, extractor.write),
+                    should_stop=self.isCanceled,
+                    on_data=self.add_progress,
+                    chunk_size=self.chunk_size,
+                )
+        except BaseException:
+            if extractor is not None:
+                extractor.abort()
+            raise
 
+        if self.isCanceled():
+            if extractor is not None:
+                extractor.abort()
+            return False
+
+        os.replace(part_path, self.dest_path)
+        logger.info(f"File downloaded successfully: {self.dest_path}")
+
+        if extractor is not None:
+            # The byte count is only known for bodies written as sent
+            encoded = response.headers.get("content-encoding", "identity").lower() != "identity"
+            if extractor.close(None if encoded else self.total_size):
+                self.extracted_path = folder
+                logger.info(f"Archive extracted while downloading: {folder}")
+            else:
+                # The archive is corrupt, it is loaded as is
+                self.extract = False
+
+        return True
+
+    def extract_downloaded(self) -> bool:
+        """
+        Extracts the downloaded archive next to it, unless it was extracted while streaming.
+
+        An archive that fails to extract is still loaded as is, through GDAL's virtual file systems.
+
+        Returns:
+            bool: False only if the task was canceled during the extraction
+        """
+        if not self.extract or self.extracted_path:
             return True
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"An error occurred during download: {e}")
+        folder = extraction_folder(self.dest_path)
+        if os.path.isdir(folder):
+            logger.info(f"Skipping extraction - Folder already exists: {folder}")
+        else:
+            self.setDescription(f"Extracting File: {self.file_name}")
+            if not extract_archive(self.dest_path, folder, self.isCanceled):
+                return not self.isCanceled()
+
+        self.extracted_path = folder
+        return True
+
+    def download_ranges(self, journal: DownloadJournal, response=None) -> bool:
+        """
+        Downloads the pending byte ranges of the journal concurrently, writing each one
+        in place into the ".part" file, then moves the completed file to its destination.
+
+        Args:
+            journal (DownloadJournal): Journal describing the ranges to download.
+            response (requests.Response): The already opened full-body response, reused
+                for the range starting at byte zero.
+
+        Returns:
+            bool: True if every range was downloaded successfully
+
+        Raises:
+            RangeRequestRejected: If the server answered a range request with the full body
+        """
+        pending = journal.pending_ranges()
+        logger.info(
+            f"Downloading {self.file_name}: {len(pending)}/{len(journal.ranges)} ranges pending"
+        )
+
+        # The body of the first response starts at byte zero
+        first = None
+        if response is not None:
+            first = next(
+                (index for index in pending if journal.ranges[index][0] + journal.ranges[index][2] == 0),
+                None,
+            )
+            if first is None:
+                response.close()
+
+        self._abort_segments.clear()
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+            futures = [
+                executor.submit(self.download_range, journal, index, response if index == first else None)
+                for index in pending
+            ]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+
+            # Stop the remaining ranges as soon as one of them fails
+            if any(future.exception() for future in done):
+                self._abort_segments.set()
+
+            results = [future.result() for future in futures]
+
+        if not all(results):
             return False
 
+        os.replace(journal.part_path, self.dest_path)
+        journal.discard()
+        logger.info(f"File downloaded successfully: {self.dest_path}")
+        return True
+
+    def download_range(self, journal: DownloadJournal, index: int, response=None) -> bool:
+        """
+        Downloads the remaining bytes of one journal range and writes them at their offset.
+
+        Dropped connections are resumed from the last byte written instead of
+        restarting the range, up to MAX_RESUME_ATTEMPTS times.
+
+        Args:
+            journal (DownloadJournal): Journal describing the ranges.
+            index (int): Index of the range to download.
+            response (requests.Response): An already opened response whose body starts
+                at the first pending byte of the range. Only the bytes of the range are read.
+
+        Returns:
+            bool: True if the range was downloaded completely
+        """
+        start, end, done = journal.ranges[index]
+        attempt = 0
+
+        def should_stop():
+            return self.isCanceled() or self._abort_segments.is_set()
+
+        while start + done <= end:
+            received = done
+            try:
+                if response is None:
+                    response = self.open_range(journal, start + done, end)
+
+                committed = done
+                with open(journal.part_path, "r+b") as file:
+                    file.seek(start + done)
+
+                    def on_data(size):
+                        nonlocal done, committed
+                        done += size
+                        self.add_progress(size)
+                        if done - committed >= JOURNAL_CHECKPOINT_SIZE:
+                            file.flush()
+                            journal.update(index, done)
+                            committed = done
+
+                    try:
+                        stream_response(
+                            response,
+                            file,
+                            max_bytes=end - (start + done) + 1,
+                            should_stop=should_stop,
+                            on_data=on_data,
+                            chunk_size=self.chunk_size,
+                        )
+                    finally:
+                        file.flush()
+                        journal.update(index, done)
+
+                if should_stop():
+                    return False
+
+                if start + done <= end and done == received:
+                    raise requests.exceptions.ConnectionError(
+                        f"Connection closed without data at byte {start + done}"
+                    )
+
+            except RESUMABLE_ERRORS as e:
+                attempt += 1
+                if attempt > MAX_RESUME_ATTEMPTS or self.isCanceled():
+                    raise
+                logger.warning(
+                    f"Connection lost at byte {start + done} of {self.file_name}, resuming ({attempt}/{MAX_RESUME_ATTEMPTS}): {e}"
+                )
+                time.sleep(RESUME_BACKOFF * attempt)
+
+            finally:
+                if response is not None:
+                    response.close()
+                    response = None
+
+        return True
+
+    def open_range(self, journal: DownloadJournal, start: int, end: int):
+        """
+        Requests the inclusive byte range [start, end] of the file.
+
+        Returns:
+            requests.Response: The streamed 206 Partial Content response
+
+        Raises:
+            RangeRequestRejected: If the server ignored the Range header or the file changed
+        """
+        headers = dict(self.request["headers"] or {})
+        headers["Range"] = f"bytes={start}-{end}"
+        if_range = journal.if_range()
+        if if_range:
+            headers["If-Range"] = if_range
+
+        response = get_session().get(
+            self.request["url"],
+            stream=True,
+            headers=headers,
+            params=self.request["params"],
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        if response.status_code != 206:
+            response.close()
+            raise RangeRequestRejected(
+                f"Server answered range {start}-{end} with status {response.status_code}"
+            )
+        return response
+
+    def add_progress(self, size: int):
+        """
+        Adds downloaded bytes to the task total and reports the combined progress,
+        at most once per PROGRESS_INTERVAL.
+
+        Args:
+            size (int): Number of bytes just written.
+        """
+        with self._progress_lock:
+            self.downloaded_size += size
+            if self.total_size:
+                progress = (self.downloaded_size / self.total_size) * 100
+                self._progress.update(progress, force=self.downloaded_size >= self.total_size)
+
     def cancel(self):
         logger.warning("Download task canceled by the user")
         super().cancel()
@@ -96,36 +497,88 @@ class DownloadFileTask(QgsTask):
     def finished(self, result):
         if result:
             logger.info("Download completed successfully")
-        else:
-            if os.path.exists(self.dest_path):
-                logger.info("Removing temporary files")
-                os.remove(self.dest_path)
+            logger.debug(f"HTTP connections: {connection_stats()}")
+            return
+
+        # Keep the partial file when the download can be resumed on the next attempt
+        if self.journal is not None and self.journal.resumable and not self.isCanceled():
+            logger.info(f"Keeping partial download for resume: {self.journal.part_path}")
+            return
+
+        if self.journal is not None:
+            logger.info("Removing temporary files")
+            self.journal.discard()
+        elif self.dest_path and os.path.exists(self.dest_path + PART_SUFFIX):
+            logger.info("Removing temporary files")
+            os.remove(self.dest_path + PART_SUFFIX)
 
-    def parse_response_header(self) -> bool:
+    def parse_response_header(self, response) -> bool:
         """
-        Parses the response header to extract the filename and total size of the file to be downloaded.
+        Parses the response header to extract the filename, the total size of the file
+        and whether the server accepts byte range requests.
+
+        Args:
+            response (requests.Response): The response of the download request.
 
         Returns:
             bool: True if the headers were successfully parsed
 
         """
         try:
-            response = session.head(
-                self.request["url"],
-                allow_redirects=True,
-                headers=self.request["headers"],
-                params=self.request["params"],
-                timeout=self.timeout,
-            )
             content_disposition = response.headers.get("content-disposition")
             self.total_size = int(response.headers.get("content-length", 0))
-        except requests.exceptions.RequestException as e:
-            logger.info(f"Failed to get filename from content-disposition header: {e}")
+        except ValueError as e:
+            logger.info(f"Failed to parse the response headers: {e}")
             return False
 
-        if content_disposition:
-            filename_match = re.findall('filename="(.+)"', content_disposition)
-            if filename_match:
-                self.file_name = filename_match[0]
+        # Ranges apply to the encoded body, so they are only used for identity responses
+        content_encoding = response.headers.get("content-encoding", "identity").lower()
+        self.accept_ranges = (
+            response.headers.get("accept-ranges", "").lower() == "bytes"
+            and content_encoding == "identity"
+        )
+        self.etag = response.headers.get("etag")
+        self.last_modified = response.headers.get("last-modified")
+
+        file_name = content_disposition_filename(content_disposition)
+        if file_name:
+            self.file_name = file_name
 
         return True
+
+
+def content_disposition_filename(content_disposition):
+    """
+    Extracts the filename of a Content-Disposition header.
+
+    Args:
+        content_disposition (str): The header value, may be None.
+
+    Returns:
+        str: The filename, None if the header does not give one
+    """
+    if not content_disposition:
+        return None
+    filename_match = re.findall('filename="(.+)"', content_disposition)
+    return filename_match[0] if filename_match else None
+
+
+def split_byte_ranges(total_size: int, segments: int) -> list:
+    """
+    Splits a file size into contiguous inclusive byte ranges.
+
+    Args:
+        total_size (int): Size of the file in bytes.
+        segments (int): Number of ranges to create.
+
+    Returns:
+        list: (start, end) tuples covering [0, total_size - 1]
+    """
+    segments = max(1, min(segments, total_size))
+    segment_size = total_size // segments
+    ranges = []
+    for index in range(segments):
+        start = index * segment_size
+        end = total_size - 1 if index == segments - 1 else start + segment_size - 1
+        ranges.append((start, end))
+    return ranges
@@ -0,0 +1,153 @@
+import time
+
+import requests
+from urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError, SSLError
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Chunks are sized to take about this long to read, which keeps cancel checks responsive
+TARGET_READ_TIME = 0.1  # seconds
+
+# Minimum delay between two progress reports
+PROGRESS_INTERVAL = 0.1  # seconds
+
+
+class AdaptiveChunkSize:
+    """
+    Chunk size following the observed throughput, so fast transfers use few large
+    reads and slow transfers still check for cancellation regularly.
+    """
+
+    def __init__(self, min_size=MIN_CHUNK_SIZE, max_size=MAX_CHUNK_SIZE, target_time=TARGET_READ_TIME):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_time = target_time
+        self.size = min_size
+
+    def observe(self, size: int, elapsed: float):
+        """
+        Adjusts the chunk size after a read.
+
+        Args:
+            size (int): Number of bytes read.
+            elapsed (float): Time taken by the read in seconds.
+        """
+        if elapsed <= 0 or size < self.size:
+            # Short reads happen at the end of the body, they say nothing about throughput
+            return
+
+        ideal = size / elapsed * self.target_time
+        if ideal > self.size * 2:
+            self.size = min(self.size * 2, self.max_size)
+        elif ideal < self.size / 2:
+            self.size = max(self.size // 2, self.min_size)
+
+
+class ProgressThrottle:
+    """Forwards progress values to a callback at most once per interval."""
+
+    def __init__(self, callback, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self._last_report = 0.0
+
+    def update(self, value, force=False):
+        now = time.monotonic()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            self.callback(value)
+
+
+class DecodedBody:
+    """
+    readinto over the decoded body of a content-encoded (gzip, deflate...) urllib3 response.
+
+    With urllib3 1.26, HTTPResponse.readinto raises ValueError when a decoded chunk is
+    larger than the buffer, so the body is read with stream() and copied into the buffer.
+    """
+
+    def __init__(self, raw, read_size):
+        self._chunks = raw.stream(read_size, decode_content=True)
+        self._pending = memoryview(b"")
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def stream_response(response, file, max_bytes=None, should_stop=None, on_data=None, chunk_size=None) -> int:
+    """
+    Copies the body of a streamed requests response into an open file.
+
+    The body is read with readinto into a reusable buffer, reallocated only when
+    the chunk size grows with the throughput, instead of iterating over small
+    fixed-size chunks.
+
+    Args:
+        response (requests.Response): Response opened with stream=True.
+        file: Binary file object positioned where the body must be written.
+        max_bytes (int): Stop after this many bytes, None to read the whole body.
+        should_stop (callable): Checked before each read, stops the copy when it returns True.
+        on_data (callable): Called with the number of bytes written after each write.
+        chunk_size (int): Fixed read size, None to adapt it to the throughput.
+
+    Returns:
+        int: Number of bytes written
+
+    Raises:
+        requests.exceptions.RequestException: If the connection fails while reading.
+    """
+    if chunk_size:
+        chunker = AdaptiveChunkSize(chunk_size, chunk_size)
+    else:
+        chunker = AdaptiveChunkSize()
+
+    raw = response.raw
+    raw.decode_content = True
+    content_encoding = response.headers.get("content-encoding", "identity").lower()
+    if content_encoding not in ("", "identity") and hasattr(raw, "stream"):
+        raw = DecodedBody(raw, chunker.size)
+    buffer = memoryview(bytearray(chunker.size))
+    written = 0
+
+    while max_bytes is None or written < max_bytes:
+        if should_stop is not None and should_stop():
+            break
+
+        size = chunker.size
+        if size > len(buffer):
+            buffer = memoryview(bytearray(size))
+        if max_bytes is not None:
+            size = min(size, max_bytes - written)
+
+        started = time.monotonic()
+        try:
+            read = raw.readinto(buffer[:size])
+        except ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        except SSLError as e:
+            raise requests.exceptions.SSLError(e)
+
+        if not read:
+            break
+        chunker.observe(read, time.monotonic() - started)
+
+        file.write(buffer[:read])
+        written += read
+        if on_data is not None:
+            on_data(read)
+
+    return written
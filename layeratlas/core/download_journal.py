@@ -0,0 +1,138 @@
+import os
+import json
+import threading
+
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+PART_SUFFIX = ".part"
+JOURNAL_SUFFIX = ".part.json"
+
+
+class DownloadJournal:
+    """
+    Sidecar journal describing the state of a partial download.
+
+    The journal sits next to the ".part" file and records the URL, the
+    validators returned by the server and, for each byte range, how many bytes
+    have been flushed to disk. It is what allows a download to resume with
+    Range requests after a failure or a QGIS restart.
+    """
+
+    def __init__(self, dest_path, url, total_size, etag=None, last_modified=None):
+        self.part_path = dest_path + PART_SUFFIX
+        self.path = dest_path + JOURNAL_SUFFIX
+        self.url = url
+        self.total_size = total_size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.ranges = []  # [start, end, done] with end inclusive
+
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, dest_path):
+        """
+        Loads the journal of a previous attempt.
+
+        Args:
+            dest_path (str): Final destination path of the download.
+
+        Returns:
+            DownloadJournal: The journal, or None if there is nothing to resume.
+        """
+        path = dest_path + JOURNAL_SUFFIX
+        if not os.path.exists(path) or not os.path.exists(dest_path + PART_SUFFIX):
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            journal = cls(
+                dest_path,
+                data["url"],
+                data["total_size"],
+                data.get("etag"),
+                data.get("last_modified"),
+            )
+            journal.ranges = [list(item) for item in data["ranges"]]
+            return journal
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable download journal {path}: {e}")
+            return None
+
+    @property
+    def resumable(self) -> bool:
+        """True if the server gave a validator that lets us check the remote file did not change."""
+        return bool(self.etag or self.last_modified)
+
+    @property
+    def bytes_completed(self) -> int:
+        with self._lock:
+            return sum(done for _, _, done in self.ranges)
+
+    def matches(self, url, total_size, etag=None, last_modified=None) -> bool:
+        """
+        Checks whether this journal describes the same remote file.
+
+        Returns:
+            bool: True if the partial data can be reused
+        """
+        if not self.resumable or self.url != url or self.total_size != total_size:
+            return False
+        if self.etag and etag:
+            return self.etag == etag
+        if self.last_modified and last_modified:
+            return self.last_modified == last_modified
+        return False
+
+    def if_range(self):
+        """Returns the value to send in the If-Range header, or None."""
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    def pending_ranges(self) -> list:
+        """Returns the indexes of the ranges that still have bytes to download."""
+        with self._lock:
+            return [
+                index
+                for index, (start, end, done) in enumerate(self.ranges)
+                if start + done <= end
+            ]
+
+    def update(self, index, done):
+        """
+        Records that the first `done` bytes of a range are flushed to disk and saves the journal.
+
+        Args:
+            index (int): Index of the range.
+            done (int): Number of bytes of the range written so far.
+        """
+        with self._lock:
+            self.ranges[index][2] = done
+            self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        data = {
+            "url": self.url,
+            "total_size": self.total_size,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "ranges": self.ranges,
+        }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.path)
+
+    def discard(self):
+        """Removes the partial file and the journal."""
+        for path in (self.part_path, self.path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,314 @@
+import heapq
+import itertools
+import json
+import time
+from urllib.parse import urlparse
+
+from qgis.core import QgsApplication, QgsSettings
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
+
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# Default limits, can be overridden in the QGIS settings
+MAX_CONCURRENT_DOWNLOADS = 4
+MAX_DOWNLOADS_PER_HOST = 2
+SETTINGS_MAX_CONCURRENT = "layeratlas/download/maxConcurrent"
+SETTINGS_MAX_PER_HOST = "layeratlas/download/maxPerHost"
+
+# Number of finished downloads still reported in the queue state
+MAX_FINISHED_HISTORY = 50
+
+# Interval of the progress reports of all the running downloads, at most 10 per second
+PROGRESS_INTERVAL = 100  # milliseconds
+SETTINGS_PROGRESS_INTERVAL = "layeratlas/download/progressInterval"
+# Weight of the latest sample in the smoothed throughput
+THROUGHPUT_SMOOTHING = 0.3
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELED = "canceled"
+
+
+class ScheduledDownload:
+    """A DownloadFileTask waiting in, or dispatched by, the DownloadScheduler."""
+
+    def __init__(self, download_id, task, priority, on_completed=None):
+        self.id = download_id
+        self.task = task
+        self.priority = priority
+        self.on_completed = on_completed
+        self.url = task.request["url"]
+        self.name = task.request.get("name") or self.url
+        self.host = urlparse(self.url).hostname or ""
+        self.state = QUEUED
+
+        self.bytes = 0
+        self.total = 0
+        self.throughput = 0.0
+        self._sampled_bytes = 0
+        self._sampled_at = None
+
+    def sample(self, now) -> bool:
+        """
+        Reads the byte counters of the running task and updates the smoothed throughput.
+
+        Returns:
+            bool: True if the progress changed since the last sample
+        """
+        # Written by the worker threads of the task, reading an int is atomic
+        downloaded, total = self.task.downloaded_size, self.task.total_size
+        changed = downloaded != self.bytes or total != self.total
+        self.bytes, self.total = downloaded, total
+
+        if self._sampled_at is not None and now > self._sampled_at:
+            rate = max(0, downloaded - self._sampled_bytes) / (now - self._sampled_at)
+            self.throughput = (
+                rate if not self.throughput
+                else THROUGHPUT_SMOOTHING * rate + (1 - THROUGHPUT_SMOOTHING) * self.throughput
+            )
+        self._sampled_bytes, self._sampled_at = downloaded, now
+        return changed
+
+    def eta(self):
+        """Returns the estimated number of seconds left, None if unknown."""
+        if self.state != RUNNING or not self.total or not self.throughput:
+            return None
+        return max(0, self.total - self.bytes) / self.throughput
+
+    def progress_dict(self) -> dict:
+        eta = self.eta()
+        return {
+            "id": self.id,
+            "state": self.state,
+            "bytes": self.bytes,
+            "total": self.total,
+            "throughput": round(self.throughput),
+            "eta": round(eta, 1) if eta is not None else None,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "url": self.url,
+            "host": self.host,
+            "priority": self.priority,
+            "state": self.state,
+        }
+
+
+class DownloadScheduler(QObject):
+    """
+    Owns the queue of download tasks and hands them to the QGIS task manager
+    while enforcing a global and a per-host concurrency limit.
+
+    Higher priorities are dispatched first, ties are dispatched in submission order.
+    """
+
+    # Emits the JSON queue state every time a download changes state
+    queueChanged = pyqtSignal(str)
+    # Emits the JSON progress of the downloads that changed, at most every PROGRESS_INTERVAL:
+    # {"downloads": [{"id", "state", "bytes", "total", "throughput", "eta"}, ...]}
+    progressChanged = pyqtSignal(str)
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """Returns the plugin-wide scheduler, creating it on first use."""
+        if cls._instance is None:
+            settings = QgsSettings()
+            cls._instance = cls(
+                settings.value(SETTINGS_MAX_CONCURRENT, MAX_CONCURRENT_DOWNLOADS, type=int),
+                settings.value(SETTINGS_MAX_PER_HOST, MAX_DOWNLOADS_PER_HOST, type=int),
+                settings.value(SETTINGS_PROGRESS_INTERVAL, PROGRESS_INTERVAL, type=int),
+            )
+        return cls._instance
+
+    def __init__(
+        self,
+        max_concurrent=MAX_CONCURRENT_DOWNLOADS,
+        max_per_host=MAX_DOWNLOADS_PER_HOST,
+        progress_interval=PROGRESS_INTERVAL,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_host = max(1, max_per_host)
+
+        # The running tasks are polled from the main thread, so worker threads never flood the GUI
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setInterval(max(PROGRESS_INTERVAL, progress_interval))
+        self._progress_timer.timeout.connect(self._report_progress)
+        self._finished_progress = []
+
+        self._ids = itertools.count(1)
+        self._queue = []  # heap of (-priority, download_id), ids grow with submission order
+        self._downloads = {}
+        self._running_per_host = {}
+
+    def submit(self, task, priority=0, on_completed=None) -> int:
+        """
+        Queues a download task.
+
+        Args:
+            task (DownloadFileTask): The task to run.
+            priority (int): Higher priorities are started first.
+            on_completed (callable): Called with the task once it completed successfully.
+
+        Returns:
+            int: The id of the scheduled download
+        """
+        download_id = next(self._ids)
+        download = ScheduledDownload(download_id, task, priority, on_completed)
+        self._downloads[download_id] = download
+        heapq.heappush(self._queue, (-priority, download_id))
+
+        task.taskCompleted.connect(lambda download=download: self._on_finished(download, COMPLETED))
+        task.taskTerminated.connect(lambda download=download: self._on_finished(download, FAILED))
+
+        logger.debug(f"Queued download {download_id} ({download.host}) with priority {priority}")
+        self._dispatch()
+        self._emit_state()
+        return download_id
+
+    def set_priority(self, download_id, priority) -> bool:
+        """
+        Changes the priority of a queued download.
+
+        Returns:
+            bool: True if the download was still waiting in the queue
+        """
+        download = self._downloads.get(download_id)
+        if download is None or download.state != QUEUED:
+            return False
+
+        download.priority = priority
+        self._queue = [item for item in self._queue if item[1] != download_id]
+        self._queue.append((-priority, download_id))
+        heapq.heapify(self._queue)
+
+        self._dispatch()
+        self._emit_state()
+        return True
+
+    def cancel(self, download_id) -> bool:
+        """
+        Cancels a queued or running download.
+
+        Returns:
+            bool: True if the download was found and canceled
+        """
+        download = self._downloads.get(download_id)
+        if download is None:
+            return False
+
+        if download.state == QUEUED:
+            self._queue = [item for item in self._queue if item[1] != download_id]
+            heapq.heapify(self._queue)
+            download.state = CANCELED
+            download.task = None
+            self._emit_state()
+            return True
+
+        if download.state == RUNNING:
+            download.task.cancel()
+            return True
+
+        return False
+
+    def cancel_all(self):
+        for download_id in list(self._downloads):
+            self.cancel(download_id)
+
+    def state(self) -> dict:
+        """Returns the state of every download known to the scheduler."""
+        downloads = [download.to_dict() for download in self._downloads.values()]
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "maxPerHost": self.max_per_host,
+            "downloads": downloads,
+        }
+
+    def _dispatch(self):
+        """Starts queued downloads while global and per-host capacity is available."""
+        running = sum(self._running_per_host.values())
+        deferred = []
+
+        while self._queue and running < self.max_concurrent:
+            item = heapq.heappop(self._queue)
+            download = self._downloads[item[1]]
+            if self._running_per_host.get(download.host, 0) >= self.max_per_host:
+                deferred.append(item)
+                continue
+
+            download.state = RUNNING
+            self._running_per_host[download.host] = self._running_per_host.get(download.host, 0) + 1
+            running += 1
+            QgsApplication.taskManager().addTask(download.task)
+            logger.debug(f"Started download {download.id} ({running}/{self.max_concurrent} running)")
+
+        if running and not self._progress_timer.isActive():
+            self._progress_timer.start()
+
+        for item in deferred:
+            heapq.heappush(self._queue, item)
+
+    def _on_finished(self, download, state):
+        if download.state != RUNNING:
+            return
+
+        self._running_per_host[download.host] -= 1
+        if not self._running_per_host[download.host]:
+            del self._running_per_host[download.host]
+
+        download.state = CANCELED if download.task.isCanceled() else state
+        logger.debug(f"Download {download.id} {download.state}")
+
+        # The final progress goes out with the next report
+        download.sample(time.monotonic())
+        self._finished_progress.append(download.progress_dict())
+
+        # A failing callback must not stop the queue
+        if download.state == COMPLETED and download.on_completed is not None:
+            try:
+                download.on_completed(download.task)
+            except Exception as e:
+                logger.error(f"Completion callback of download {download.id} failed: {e}")
+
+        # Forget about the task once it is done, QGIS deletes the underlying object
+        download.task = None
+        self._prune_history()
+
+        self._dispatch()
+        self._emit_state()
+
+    def _prune_history(self):
+        finished = [
+            download_id
+            for download_id, download in self._downloads.items()
+            if download.state in (COMPLETED, FAILED, CANCELED)
+        ]
+        for download_id in finished[:-MAX_FINISHED_HISTORY]:
+            del self._downloads[download_id]
+
+    def _report_progress(self):
+        """Emits the progress of the running downloads that changed, and of those that just finished."""
+        now = time.monotonic()
+        running = [download for download in self._downloads.values() if download.state == RUNNING]
+        progress = [download.progress_dict() for download in running if download.sample(now)]
+        progress += self._finished_progress
+        self._finished_progress = []
+
+        if progress:
+            self.progressChanged.emit(json.dumps({"downloads": progress}))
+        if not running:
+            self._progress_timer.stop()
+
+    def _emit_state(self):
+        self.queueChanged.emit(json.dumps(self.state()))
+
@@ -0,0 +1,242 @@
+import time
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import InvalidHeader
+
+from qgis.core import QgsSettings
+
+from layeratlas.core.download_scheduler import (
+    MAX_CONCURRENT_DOWNLOADS,
+    MAX_DOWNLOADS_PER_HOST,
+    SETTINGS_MAX_CONCURRENT,
+    SETTINGS_MAX_PER_HOST,
+)
+from layeratlas.core.http_session import CONNECTIONS_PER_DOWNLOAD, retry_strategy
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# httpx and h2 are not shipped with QGIS, the HTTP/2 backend is only used when both are installed
+try:
+    import httpx
+    import h2  # noqa: F401
+except ImportError:
+    httpx = None
+
+# Download over HTTP/2 when httpx and h2 are installed
+SETTINGS_HTTP2 = "layeratlas/download/http2"
+
+# Connection attempts retried by the httpx transport, status codes are retried by Http2Session.get
+# with the retry strategy of the requests sessions
+CONNECT_RETRIES = 4
+
+# Longest wait between two retries, like urllib3
+MAX_BACKOFF = 120  # seconds
+
+
+def http2_available() -> bool:
+    """Returns True if the optional httpx and h2 packages are installed."""
+    return httpx is not None
+
+
+class Http2Session:
+    """
+    Drop-in replacement for the requests.Session calls of DownloadFileTask, backed by an HTTP/2 httpx client.
+
+    A single thread-safe httpx.Client is shared by every task and segment thread:
+    concurrent requests to the same host are multiplexed as streams of one HTTP/2
+    connection, paying the TCP and TLS handshakes once. Servers without HTTP/2
+    are still reached over HTTP/1.1 through the same client.
+
+    Responses are wrapped in Http2Response, which provides the subset of
+    requests.Response used by the downloads, and httpx errors are raised as the
+    matching requests exceptions so the retry and resume logic is unchanged.
+    The status codes of retry_strategy are retried with the same backoff.
+    """
+
+    _instance = None
+    _disabled = False
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Returns the plugin-wide HTTP/2 session, None if it is disabled or httpx is not installed."""
+        # First called from the download worker threads, a single client must be created
+        if cls._instance is None and not cls._disabled:
+            with cls._instance_lock:
+                if cls._instance is None and not cls._disabled:
+                    cls._create_instance()
+        return cls._instance
+
+    @classmethod
+    def _create_instance(cls):
+        settings = QgsSettings()
+        if not settings.value(SETTINGS_HTTP2, False, type=bool):
+            cls._disabled = True
+        elif not http2_available():
+            logger.warning("HTTP/2 downloads enabled but httpx[http2] is not installed, using requests")
+            cls._disabled = True
+        else:
+            cls._instance = cls(
+                settings.value(SETTINGS_MAX_CONCURRENT, MAX_CONCURRENT_DOWNLOADS, type=int),
+                settings.value(SETTINGS_MAX_PER_HOST, MAX_DOWNLOADS_PER_HOST, type=int),
+            )
+
+    def __init__(
+        self, max_concurrent=MAX_CONCURRENT_DOWNLOADS, max_per_host=MAX_DOWNLOADS_PER_HOST, http1=True, verify=True
+    ):
+        # The TLS settings belong to the transport, the client ignores them when one is given
+        self.client = httpx.Client(
+            http1=http1,
+            http2=True,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max(1, max_concurrent) * CONNECTIONS_PER_DOWNLOAD,
+                max_keepalive_connections=max(1, max_per_host) * CONNECTIONS_PER_DOWNLOAD,
+            ),
+            transport=httpx.HTTPTransport(http1=http1, http2=True, verify=verify, retries=CONNECT_RETRIES),
+        )
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._versions = {}
+
+    def get(self, url, stream=False, headers=None, params=None, timeout=None):
+        """
+        Sends a GET request, mirroring requests.Session.get.
+
+        Responses whose status is in the retry_strategy status_forcelist are retried,
+        like the requests sessions do, honouring Retry-After.
+
+        Returns:
+            Http2Response: The response, its body read lazily when stream is True
+        """
+        for attempt in range(retry_strategy.total + 1):
+            request = self.client.build_request("GET", url, headers=headers, params=params, timeout=timeout)
+            try:
+                response = self.client.send(request, stream=True)
+            except httpx.HTTPError as e:
+                raise as_requests_exception(e)
+
+            if response.status_code not in retry_strategy.status_forcelist or attempt == retry_strategy.total:
+                break
+
+            delay = retry_delay(response, attempt)
+            response.close()
+            logger.warning(
+                f"{url} answered {response.status_code}, retrying in {delay:.0f}s ({attempt + 1}/{retry_strategy.total})"
+            )
+            time.sleep(delay)
+
+        with self._stats_lock:
+            self._requests += 1
+            self._versions[response.http_version] = self._versions.get(response.http_version, 0) + 1
+
+        wrapped = Http2Response(response)
+        if not stream:
+            wrapped.content
+        return wrapped
+
+    def stats(self) -> dict:
+        """Returns the number of requests sent per HTTP version."""
+        with self._stats_lock:
+            return {"backend": "http2", "requests": self._requests, "versions": dict(self._versions)}
+
+    def close(self):
+        self.client.close()
+
+
+class Http2Response:
+    """The subset of requests.Response read by DownloadFileTask, over an httpx response."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = CaseInsensitiveDict(response.headers.multi_items())
+        self.url = str(response.url)
+        self.http_version = response.http_version
+        self.raw = Http2RawStream(response)
+        self._content = None
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            try:
+                self._content = self._response.read()
+            except httpx.HTTPError as e:
+                raise as_requests_exception(e)
+            finally:
+                self._response.close()
+        return self._content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            self.close()
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error: {self._response.reason_phrase} for url: {self.url}", response=self
+            )
+
+    def close(self):
+        self._response.close()
+
+
+class Http2RawStream:
+    """
+    readinto over the body of an httpx response, like urllib3's HTTPResponse used by stream_response.
+
+    The body is decoded (gzip, deflate...) when decode_content is True, which is what
+    stream_response asks for.
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = None
+        self._pending = memoryview(b"")
+        self.decode_content = False
+
+    def readinto(self, buffer) -> int:
+        if self._chunks is None:
+            self._chunks = self._response.iter_bytes() if self.decode_content else self._response.iter_raw()
+
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+            except httpx.HTTPError as e:
+                raise as_requests_exception(e)
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def retry_delay(response, attempt) -> float:
+    """
+    Returns the wait before retrying a response, its Retry-After header or the
+    exponential backoff of retry_strategy, no wait before the first retry like urllib3.
+    """
+    retry_after = response.headers.get("retry-after")
+    if retry_after and retry_strategy.respect_retry_after_header:
+        try:
+            return min(retry_strategy.parse_retry_after(retry_after), MAX_BACKOFF)
+        except InvalidHeader:
+            pass
+    if attempt == 0:
+        return 0
+    return min(retry_strategy.backoff_factor * 2 ** attempt, MAX_BACKOFF)
+
+
+def as_requests_exception(error):
+    """Maps an httpx error to the requests exception the download retry and resume logic expects."""
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(error)
+    if isinstance(error, httpx.DecodingError):
+        return requests.exceptions.ContentDecodingError(error)
+    if isinstance(error, (httpx.RemoteProtocolError, httpx.ReadError)):
+        return requests.exceptions.ChunkedEncodingError(error)
+    if isinstance(error, httpx.TransportError):
+        return requests.exceptions.ConnectionError(error)
+    return requests.exceptions.RequestException(error)
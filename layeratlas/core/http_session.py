@@ -0,0 +1,142 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+from qgis.core import QgsSettings
+
+from layeratlas.core.download_scheduler import (
+    MAX_CONCURRENT_DOWNLOADS,
+    MAX_DOWNLOADS_PER_HOST,
+    SETTINGS_MAX_CONCURRENT,
+    SETTINGS_MAX_PER_HOST,
+)
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# Connections a single download may open at once, one per byte range
+CONNECTIONS_PER_DOWNLOAD = 4
+
+# Define the retry strategy
+retry_strategy = Retry(
+    total=4,  # Maximum number of retries
+    backoff_factor=2,  # Exponential backoff factor
+    status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
+)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter counting the requests it sends, to report how often connections are reused."""
+
+    def __init__(self, *args, **kwargs):
+        self._requests_lock = threading.Lock()
+        self.requests_sent = 0
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        with self._requests_lock:
+            self.requests_sent += 1
+        return super().send(request, *args, **kwargs)
+
+
+class SessionPool:
+    """
+    Hands out one requests.Session per thread, all sharing the connection pool of a single adapter.
+
+    requests.Session is not thread-safe (cookies, redirects state), the urllib3
+    PoolManager behind the adapter is, so downloads running on different worker
+    threads reuse each other's keep-alive connections without sharing a Session.
+    The pool holds enough connections per host for every download the scheduler
+    may run against that host, each with all its byte ranges.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Returns the plugin-wide session pool, sized from the download scheduler settings."""
+        # First called from the download worker threads, a single pool must be created
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    settings = QgsSettings()
+                    cls._instance = cls(
+                        settings.value(SETTINGS_MAX_CONCURRENT, MAX_CONCURRENT_DOWNLOADS, type=int),
+                        settings.value(SETTINGS_MAX_PER_HOST, MAX_DOWNLOADS_PER_HOST, type=int),
+                    )
+        return cls._instance
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_DOWNLOADS, max_per_host=MAX_DOWNLOADS_PER_HOST):
+        max_concurrent = max(1, max_concurrent)
+        max_per_host = max(1, min(max_per_host, max_concurrent))
+
+        self.adapter = PooledHTTPAdapter(
+            # Hosts whose connections are kept, one per download running at most
+            pool_connections=max_concurrent,
+            # Connections kept per host
+            pool_maxsize=max_per_host * CONNECTIONS_PER_DOWNLOAD,
+            max_retries=retry_strategy,
+        )
+        self._local = threading.local()
+        logger.debug(
+            f"HTTP session pool: {max_concurrent} host(s), {max_per_host * CONNECTIONS_PER_DOWNLOAD} connection(s) per host"
+        )
+
+    def session(self) -> requests.Session:
+        """Returns the session of the calling thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self._local.session = session
+        return session
+
+    def stats(self) -> dict:
+        """
+        Returns the keep-alive statistics of the connection pools.
+
+        Returns:
+            dict: requests sent, connections opened and the share of requests served by a reused
+            connection, for the hosts whose pools are still open, and the total of requests sent
+        """
+        pools = [self.adapter.poolmanager.pools[key] for key in self.adapter.poolmanager.pools.keys()]
+        requests_count = sum(pool.num_requests for pool in pools)
+        connections = sum(pool.num_connections for pool in pools)
+        return {
+            "hosts": len(pools),
+            "requests": requests_count,
+            "connections": connections,
+            "reuseRatio": round(1 - connections / requests_count, 3) if requests_count else 0,
+            "totalRequests": self.adapter.requests_sent,
+        }
+
+
+def get_session():
+    """
+    Returns the HTTP session of the calling thread.
+
+    Returns:
+        The HTTP/2 session if enabled and available, otherwise the requests.Session of the
+        calling thread, backed by the shared connection pool
+    """
+    # Imported here, the HTTP/2 module depends on this one
+    from layeratlas.core.http2_session import Http2Session
+
+    http2_session = Http2Session.instance()
+    if http2_session is not None:
+        return http2_session
+    return SessionPool.instance().session()
+
+
+def connection_stats() -> dict:
+    """Returns the statistics of the HTTP backend used by the downloads."""
+    from layeratlas.core.http2_session import Http2Session
+
+    http2_session = Http2Session.instance()
+    if http2_session is not None:
+        return http2_session.stats()
+    return dict(backend="requests", **SessionPool.instance().stats())
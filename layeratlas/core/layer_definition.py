@@ -0,0 +1,248 @@
+from qgis.core import (
+    QgsLayerDefinition,
+    QgsLayerTree,
+    QgsLayerTreeGroup,
+    QgsProject,
+    QgsReadWriteContext,
+)
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
+from qgis.PyQt.QtXml import QDomDocument
+
+from layeratlas.helper.logging_helper import setup_logger
+
+logger = setup_logger(__name__)
+
+# Layers exported per event loop iteration by a BulkLayerExport, so progress reaches the page
+EXPORT_CHUNK_SIZE = 5
+
+
+def parse_layer_definition(xml: str):
+    """
+    Parse a layer definition (QLR) XML string.
+
+    Parameters:
+    xml (str): The layer definition XML.
+
+    Returns:
+    The QDomDocument, or None if the XML is not valid.
+    """
+    document = QDomDocument("qgis-layer-definition")
+    result = document.setContent(xml)
+    # PyQt returns (ok, message, line, column), Qt 6.5+ bindings a ParseResult
+    ok = result[0] if isinstance(result, tuple) else bool(result)
+    if not ok:
+        logger.error(f"Invalid layer definition XML: {result}")
+        return None
+    return document
+
+
+def load_layer_definitions(xml_definitions, project=None, parent_group=None) -> int:
+    """
+    Load layer definitions from memory and add their layers to the project in a single layer tree update.
+
+    Each definition is loaded into a detached layer tree group, the nodes of all the
+    definitions are then inserted into the parent group at once.
+
+    Must be called from the main thread.
+
+    Parameters:
+    xml_definitions (list): Layer definition XML strings, or QDomDocuments already parsed.
+    project (QgsProject): The project to add the layers to, the current project by default.
+    parent_group (QgsLayerTreeGroup): The group receiving the layers, the layer tree root by default.
+
+    Returns:
+    The number of layer definitions successfully loaded.
+    """
+    project = project or QgsProject.instance()
+    parent_group = parent_group or project.layerTreeRoot()
+
+    context = QgsReadWriteContext()
+    context.setPathResolver(project.pathResolver())
+    context.setProjectTranslator(project)
+    context.setTransformContext(project.transformContext())
+
+    staging = QgsLayerTreeGroup()
+    loaded = 0
+    for xml in xml_definitions:
+        document = xml if isinstance(xml, QDomDocument) else parse_layer_definition(xml)
+        if document is None:
+            continue
+
+        ok, error_message = QgsLayerDefinition.loadLayerDefinition(document, project, staging, context)
+        if not ok:
+            logger.error(f"Failed to load layer definition: {error_message}")
+            continue
+        loaded += 1
+
+    nodes = [node.clone() for node in staging.children()]
+    if nodes:
+        parent_group.insertChildNodes(-1, nodes)
+    return loaded
+
+
+def parse_layer_definitions(task, xml_definitions) -> list:
+    """
+    Parse layer definition XML strings, run in a QgsTask so large definitions do not block the GUI.
+
+    Returns:
+    The QDomDocuments of the valid definitions.
+    """
+    documents = []
+    for index, xml in enumerate(xml_definitions):
+        if task is not None and task.isCanceled():
+            break
+        document = parse_layer_definition(xml)
+        if document is not None:
+            documents.append(document)
+        if task is not None:
+            task.setProgress(100 * (index + 1) / len(xml_definitions))
+    return documents
+
+
+def export_layer_definition(nodes):
+    """
+    Export layer tree nodes to a layer definition (QLR) XML string, in memory.
+
+    Nodes nested in another exported group are skipped, they are already part of their group.
+    Data sources are written as absolute paths.
+
+    Parameters:
+    nodes (list): The layer tree nodes (layers or groups) to export.
+
+    Returns:
+    The layer definition XML, or None if the export failed.
+    """
+    nodes = top_level_nodes(nodes)
+    if not nodes:
+        return None
+
+    document = QDomDocument("qgis-layer-definition")
+    ok, error_message = QgsLayerDefinition.exportLayerDefinition(document, nodes, QgsReadWriteContext())
+    if not ok:
+        logger.error(f"Failed to export layer definition: {error_message}")
+        return None
+    return document.toString()
+
+
+def top_level_nodes(nodes) -> list:
+    """
+    Filter out the nodes whose parent group is also in the list, keeping the order.
+
+    Parameters:
+    nodes (list): Layer tree nodes, e.g. the selection of the layer tree view.
+
+    Returns:
+    The nodes without an ancestor in the list.
+    """
+    selected = {id(node) for node in nodes}
+    top_level = []
+    for node in nodes:
+        parent = node.parent()
+        while parent is not None and id(parent) not in selected:
+            parent = parent.parent()
+        if parent is None:
+            top_level.append(node)
+    return top_level
+
+
+def collect_layers(nodes, include_groups=True):
+    """
+    List the layers of layer tree nodes, without duplicated data sources.
+
+    Parameters:
+    nodes (list): Layer tree nodes, e.g. the selection of the layer tree view.
+    include_groups (bool): Whether the layers of selected groups are included, recursively.
+
+    Returns:
+    A tuple (layers, duplicates): a list of (layer id, group path) tuples in layer tree
+    order, group path being the names of the groups below the selected group, and the
+    number of layers skipped because their data source was already listed.
+    """
+    layers = []
+    sources = set()
+    duplicates = 0
+
+    for node in top_level_nodes(nodes):
+        if QgsLayerTree.isLayer(node):
+            candidates = [(node, [])]
+        elif include_groups and QgsLayerTree.isGroup(node):
+            candidates = [(layer_node, group_path(layer_node, node)) for layer_node in node.findLayers()]
+        else:
+            continue
+
+        for layer_node, path in candidates:
+            layer = layer_node.layer()
+            if layer is None:
+                continue
+            source = (layer.providerType(), layer.source())
+            if source in sources:
+                duplicates += 1
+                continue
+            sources.add(source)
+            layers.append((layer.id(), path))
+
+    return layers, duplicates
+
+
+def group_path(node, ancestor) -> list:
+    """
+    List the names of the groups from an ancestor group (included) down to a node (excluded).
+    """
+    path = []
+    parent = node.parent()
+    while parent is not None:
+        path.insert(0, parent.name())
+        if parent is ancestor:
+            break
+        parent = parent.parent()
+    return path
+
+
+class BulkLayerExport(QObject):
+    """
+    Exports many layers to one layer definition each, a few layers per event loop iteration.
+
+    Layers sharing a data source are exported once. The result is a list of
+    {"id", "name", "group", "definition"} dictionaries, "group" being the
+    names of the groups the layer was selected through.
+    """
+
+    # Number of layers exported and total number of layers
+    progressChanged = pyqtSignal(int, int)
+    # The exported layers
+    finished = pyqtSignal(list)
+
+    def __init__(self, nodes, include_groups=True, parent=None):
+        super().__init__(parent)
+        self.layers, self.duplicates = collect_layers(nodes, include_groups)
+        self.exported = []
+        self._next = 0
+
+    def start(self):
+        """Starts exporting, progressChanged and finished are emitted from the event loop."""
+        logger.info(
+            f"Exporting {len(self.layers)} layer(s), {self.duplicates} duplicated data source(s) skipped"
+        )
+        QTimer.singleShot(0, self._export_chunk)
+
+    def _export_chunk(self):
+        root = QgsProject.instance().layerTreeRoot()
+        for layer_id, path in self.layers[self._next:self._next + EXPORT_CHUNK_SIZE]:
+            node = root.findLayer(layer_id)
+            # The layer may have been removed since the export started
+            if node is None:
+                continue
+            definition = export_layer_definition([node])
+            if definition is None:
+                continue
+            self.exported.append(
+                {"id": layer_id, "name": node.name(), "group": path, "definition": definition}
+            )
+
+        self._next = min(self._next + EXPORT_CHUNK_SIZE, len(self.layers))
+        self.progressChanged.emit(self._next, len(self.layers))
+
+        if self._next < len(self.layers):
+            QTimer.singleShot(0, self._export_chunk)
+        else:
+            self.finished.emit(self.exported)
@@ -1,18 +1,31 @@
 import os
 
 from qgis.core import (
+    QgsApplication,
     QgsProject,
     QgsProviderRegistry,
     QgsCoordinateTransformContext,
     QgsWkbTypes,
     QgsVectorLayer,
+    QgsTask,
 )
+from qgis.PyQt.QtCore import QCoreApplication, QObject, QTimer
 
 from layeratlas.helper.logging_helper import setup_logger
 
 logger = setup_logger(__name__)
 
 
+# Delay used to gather the layers of downloads finishing together into one project update
+BATCH_DELAY = 250  # milliseconds
+
+# Files of an extracted archive that only complement a dataset, never queried for layers
+SIDECAR_EXTENSIONS = {
+    ".shx", ".prj", ".cpg", ".qix", ".sbn", ".sbx", ".qmd", ".qml", ".sld",
+    ".xml", ".aux", ".ovr", ".tfw", ".jgw", ".pgw", ".wld",
+}
+
+
 def loadFile(dest_path: str, file_name: str) -> bool:
     """
     Load a file into the QGIS project.
@@ -25,41 +38,223 @@ def loadFile(dest_path: str, file_name: str) -> bool:
     True if the file was successfully loaded, False otherwise.
     """
     try:
-        provider = QgsProviderRegistry.instance()
-        QgsProviderSublayerDetails = provider.querySublayers(dest_path)
+        group_name, layers = discover_layers(dest_path, file_name)
+        add_layers_to_project([(group_name, layers)])
+
+        logger.info(f"Successfully loaded: {dest_path}")
+        return True
 
-        transform_context = QgsCoordinateTransformContext()
-        file_name_trimmed = os.path.splitext(file_name)[0]
+    except Exception as e:
+        logger.error(f"Failed to load file: {dest_path} - {e}")
+        return False
 
-        # If multiple sublayers are found, add them to a group
-        group = None
-        if len(QgsProviderSublayerDetails) > 1:
-            root = QgsProject.instance().layerTreeRoot()
-            group = root.addGroup(file_name_trimmed)
 
+def discover_layers(dest_path: str, file_name: str):
+    """
+    Query the sublayers of a file and create the corresponding map layers.
+
+    This does not touch the project and can run in a background thread.
+
+    Parameters:
+    dest_path (str): The path of the file, or the folder an archive was extracted to.
+    file_name (str): The name of the file, used to name the group and unnamed layers.
+
+    Returns:
+    A (group_name, layers) tuple, group_name is None when the file has a single layer.
+    """
+    file_name_trimmed = os.path.splitext(file_name)[0]
+
+    # An extracted archive, each dataset of the folder is queried
+    if os.path.isdir(dest_path) and not dest_path.lower().endswith(".gdb"):
+        file_name_trimmed = os.path.basename(dest_path)
         layers = []
-        for QgsProviderSublayerDetail in QgsProviderSublayerDetails:
-            options = QgsProviderSublayerDetail.LayerOptions(transform_context)
-            layer = QgsProviderSublayerDetail.toLayer(options)
-            if layer.name() == "Layer1":
-                layer.setName(file_name_trimmed)
-            layers.append(layer)
+        for path in dataset_paths(dest_path):
+            layers.extend(query_layers(path, os.path.splitext(os.path.basename(path))[0]))
+    else:
+        layers = query_layers(dest_path, file_name_trimmed)
 
-        ordered_layers = order_layers_by_geometry_type(layers)
+    # If multiple sublayers are found, add them to a group
+    group_name = file_name_trimmed if len(layers) > 1 else None
 
-        if group is None:
-            QgsProject.instance().addMapLayers(ordered_layers)
-        else:
-            QgsProject.instance().addMapLayers(ordered_layers, False)
-            for layer in ordered_layers:
+    return group_name, order_layers_by_geometry_type(layers)
+
+
+def query_layers(path: str, name: str):
+    """
+    Create the map layers of the sublayers of a file.
+
+    Parameters:
+    path (str): The path of the file.
+    name (str): The name given to unnamed layers.
+
+    Returns:
+    A list of map layers.
+    """
+    provider = QgsProviderRegistry.instance()
+    QgsProviderSublayerDetails = provider.querySublayers(path)
+
+    transform_context = QgsCoordinateTransformContext()
+
+    layers = []
+    for QgsProviderSublayerDetail in QgsProviderSublayerDetails:
+        options = QgsProviderSublayerDetail.LayerOptions(transform_context)
+        layer = QgsProviderSublayerDetail.toLayer(options)
+        if layer.name() == "Layer1":
+            layer.setName(name)
+        layers.append(layer)
+    return layers
+
+
+def dataset_paths(folder: str):
+    """
+    List the files of an extracted archive that may hold layers.
+
+    Sidecar files (index, projection, styles...) are skipped, as are the .dbf
+    of shapefiles, and file geodatabase folders are listed as a whole.
+
+    Parameters:
+    folder (str): The extraction folder.
+
+    Returns:
+    A sorted list of paths.
+    """
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        for name in [name for name in dirs if name.lower().endswith(".gdb")]:
+            paths.append(os.path.join(root, name))
+            dirs.remove(name)
+
+        stems = {os.path.splitext(name)[0].lower() for name in files if name.lower().endswith(".shp")}
+        for name in files:
+            stem, extension = os.path.splitext(name.lower())
+            if extension in SIDECAR_EXTENSIONS or (extension == ".dbf" and stem in stems):
+                continue
+            paths.append(os.path.join(root, name))
+
+    return sorted(path.replace("\\", "/") for path in paths)
+
+
+def add_layers_to_project(batches) -> None:
+    """
+    Add the layers of one or more files to the project in a single update.
+
+    Must be called from the main thread.
+
+    Parameters:
+    batches: A list of (group_name, layers) tuples as returned by discover_layers.
+    """
+    project = QgsProject.instance()
+
+    ungrouped = [layer for group_name, layers in batches if group_name is None for layer in layers]
+    grouped = [(group_name, layers) for group_name, layers in batches if group_name is not None]
+
+    if ungrouped:
+        project.addMapLayers(ungrouped)
+
+    if grouped:
+        project.addMapLayers([layer for _, layers in grouped for layer in layers], False)
+        root = project.layerTreeRoot()
+        for group_name, layers in grouped:
+            group = root.addGroup(group_name)
+            for layer in layers:
                 group.addLayer(layer)
 
-        logger.info(f"Successfully loaded: {dest_path}")
-        return True
 
-    except Exception as e:
-        logger.error(f"Failed to load file: {dest_path} - {e}")
-        return False
+class LoadFileTask(QgsTask):
+    """
+    Discovers and creates the layers of a downloaded file in a background thread.
+
+    The layers are moved to the main thread once created, adding them to the
+    project is left to the LayerLoader.
+    """
+
+    def __init__(self, dest_path: str, file_name: str):
+        super().__init__(f"Loading File: {file_name}", QgsTask.CanCancel)
+        self.dest_path = dest_path
+        self.file_name = file_name
+        self.group_name = None
+        self.layers = []
+
+    def run(self):
+        try:
+            self.group_name, self.layers = discover_layers(self.dest_path, self.file_name)
+
+            main_thread = QCoreApplication.instance().thread()
+            for layer in self.layers:
+                if self.isCanceled():
+                    return False
+                # Warm up the values computed lazily by the providers
+                layer.extent()
+                if isinstance(layer, QgsVectorLayer):
+                    layer.featureCount()
+                layer.moveToThread(main_thread)
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to load file: {self.dest_path} - {e}")
+            return False
+
+
+class LayerLoader(QObject):
+    """
+    Loads downloaded files into the project.
+
+    Each file is prepared by a LoadFileTask and the layers of the files finishing
+    within BATCH_DELAY of each other are added to the project in one update.
+    """
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        """Returns the plugin-wide layer loader, creating it on first use."""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = []
+        self._pending = []
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(BATCH_DELAY)
+        self._timer.timeout.connect(self.flush)
+
+    def load(self, dest_path: str, file_name: str) -> None:
+        """
+        Starts loading a file in the background.
+
+        Parameters:
+        dest_path (str): The path of the file.
+        file_name (str): The name of the file.
+        """
+        task = LoadFileTask(dest_path, file_name)
+        task.taskCompleted.connect(lambda task=task: self._on_loaded(task))
+        task.taskTerminated.connect(lambda task=task: self._tasks.remove(task))
+        self._tasks.append(task)
+        QgsApplication.taskManager().addTask(task)
+
+    def _on_loaded(self, task):
+        self._tasks.remove(task)
+        if task.layers:
+            self._pending.append(task)
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Adds the layers of every file loaded so far to the project."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        try:
+            add_layers_to_project([(task.group_name, task.layers) for task in pending])
+            for task in pending:
+                logger.info(f"Successfully loaded: {task.dest_path}")
+        except Exception as e:
+            logger.error(f"Failed to add {len(pending)} file(s) to the project - {e}")
 
 
 def order_layers_by_geometry_type(layers):
@@ -22,15 +22,14 @@
  ***************************************************************************/
 """
 import os
+import time
 
-from qgis.core import QgsMapLayerType, QgsLayerDefinition
 from qgis.gui import QgsDockWidget, QgisInterface
 from qgis.PyQt import QtWidgets
-from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtCore import Qt, pyqtSignal, QUrl
 
 from layeratlas.gui.fallback_widget import FallbackWidget
-from layeratlas.helper.logging_helper import setup_logger
+from layeratlas.helper.logging_helper import setup_logger, spans, timed_span, TRACE_FILE_ENV
 
 logger = setup_logger(__name__)
 
@@ -46,14 +45,15 @@ class LayerAtlasDockWidget(QgsDockWidget):
         self.setWindowTitle(self.tr("Layer Atlas"))
         self.setAllowedAreas(Qt.DockWidgetArea.LeftDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea)
 
-        self.contextMenuActions = []
+        self.view = None
         self.dev_mode = False
 
         logger.debug("Creating WebEngineView")
 
         try:
-            from layeratlas.communication.web_engine_view import WebEngineView
-            self.view = WebEngineView(self.iface)
+            with timed_span("WebEngineView creation"):
+                from layeratlas.communication.web_engine_view import WebEngineView
+                self.view = WebEngineView(self.iface)
         except Exception as e:
             logger.warning("WebEngineView creation failed, using fallback widget")
             fallback_widget = FallbackWidget(self.iface, self)
@@ -61,30 +61,21 @@ class LayerAtlasDockWidget(QgsDockWidget):
             return
         
         logger.debug("Setting URL to Layer Atlas production site")
+        self.page_load_start = time.perf_counter()
+        self.view.loadFinished.connect(self.first_page_load_finished)
         self.view.setUrl(QUrl("https://www.layeratlas.com/?qgis=true"))
 
         self.setWidget(self.view)
-        self.add_actions_layer_tree()
         logger.info("LayerAtlasDockWidget initialization completed successfully")
 
-    def add_actions_layer_tree(self):
-        """Add custom actions to the layer tree context menu for uploading layers to Layer Atlas."""
-        logger.debug("Adding custom actions to layer tree context menu")
-        for layer_type in QgsMapLayerType:
-            uploadAction = QtWidgets.QAction("Add to Layer Atlas")
-            uploadAction.setIcon(QIcon(":icons/upload_sign.svg"))
-            uploadAction.triggered.connect(self.add_layer_to_layer_atlas)
-            self.iface.addCustomActionForLayerType(uploadAction, None, layer_type, True)
-            self.contextMenuActions.append(uploadAction)
-        logger.info(f"Successfully added {len(self.contextMenuActions)} context menu actions for layer types")
-
-    def remove_actions_layer_tree(self):
-        """Removes custom actions from the layer tree context menu."""
-        logger.debug(f"Removing {len(self.contextMenuActions)} custom actions from layer tree context menu")
-        for uploadAction in self.contextMenuActions:
-            self.iface.removeCustomActionForLayerType(uploadAction)
-        self.contextMenuActions = []
-        logger.info("Successfully removed all context menu actions")
+    def first_page_load_finished(self, ok):
+        """Record the duration of the first page load and export the startup spans if requested."""
+        self.view.loadFinished.disconnect(self.first_page_load_finished)
+        spans.record("page load", self.page_load_start, time.perf_counter(), ok=ok)
+
+        trace_file = os.environ.get(TRACE_FILE_ENV)
+        if trace_file:
+            spans.export(trace_file)
 
     def add_layer_to_layer_atlas(self):
         logger.info("Starting layer upload to Layer Atlas")
@@ -92,33 +83,11 @@ class LayerAtlasDockWidget(QgsDockWidget):
             logger.debug("Showing LayerAtlasDockWidget window")
             self.show()
         
-        layerTreeView = self.iface.layerTreeView()
-        selectedNodes = layerTreeView.selectedNodes()
-        
-        if not selectedNodes:
-            logger.warning("No layers selected for upload")
+        if self.view is None:
+            logger.warning("Layer Atlas web view is not available - cannot upload layers")
             return
-            
-        logger.debug(f"Selected {len(selectedNodes)} node(s) for upload")
-        temp_file_path = "temp.qlr"
-        
-        try:
-            logger.debug(f"Exporting layer definition to temporary file: {temp_file_path}")
-            QgsLayerDefinition.exportLayerDefinition(temp_file_path, [selectedNodes[0]])
-            
-            with open(temp_file_path, "r") as file:
-                layer_definition_xml = file.read()
-                logger.debug("Emitting CreateLayer signal with layer definition XML")
-                self.view.communication_bus.EmitCreateLayer.emit(layer_definition_xml)
-            
-            os.remove(temp_file_path)
-            logger.info("Successfully processed layer upload to Layer Atlas")
-            
-        except Exception as e:
-            logger.error(f"Failed to upload layer to Layer Atlas: {str(e)}")
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-                logger.debug("Cleaned up temporary file after error")
+
+        self.view.add_layer_to_layer_atlas()
 
     def keyPressEvent(self, event):
         """Handle key press events for debugging and reloading the plugin."""
@@ -162,5 +131,4 @@ class LayerAtlasDockWidget(QgsDockWidget):
 
     def cleanup_on_close(self):
         """Cleanup the plugin on close."""
-        self.remove_actions_layer_tree()
         logger.info("LayerAtlasDockWidget cleanup completed")
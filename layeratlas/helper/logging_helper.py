@@ -1,4 +1,9 @@
+import os
+import json
+import time
 import logging
+import threading
+from contextlib import contextmanager
 from qgis.core import QgsMessageLog, Qgis
 
 LOG_GROUP = "Layer Atlas"
@@ -50,5 +55,80 @@ def setup_logger(name=None, level=logging.DEBUG):
     return logger
 
 
+class SpanRecorder:
+    """Records named timing spans, exportable as JSON or as a Chrome trace."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name, **args):
+        """Time the enclosed block and record it under the given name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), **args)
+
+    def record(self, name, start, end, **args):
+        """Record a span from two time.perf_counter() values."""
+        span = {
+            "name": name,
+            "start": start - self._origin,
+            "duration": end - start,
+            "thread": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.spans.append(span)
+        logger.debug(f"{name}: {span['duration'] * 1000:.1f} ms")
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+    def to_json(self):
+        """Return the spans as a JSON string, times in seconds."""
+        with self._lock:
+            return json.dumps(self.spans, indent=2)
+
+    def to_chrome_trace(self):
+        """Return the spans in the Chrome trace event format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = [
+                {
+                    "name": span["name"],
+                    "ph": "X",
+                    "ts": span["start"] * 1e6,
+                    "dur": span["duration"] * 1e6,
+                    "pid": os.getpid(),
+                    "tid": span["thread"],
+                    "args": span["args"],
+                }
+                for span in self.spans
+            ]
+        return json.dumps({"traceEvents": events})
+
+    def export(self, path):
+        """Write the spans to a file, as a Chrome trace if the name ends with .trace.json."""
+        content = self.to_chrome_trace() if path.endswith(".trace.json") else self.to_json()
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        logger.info(f"Exported {len(self.spans)} timing spans to {path}")
+
+
 # Create a default logger for the plugin
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
+
+# Timing spans of the plugin, e.g. the startup phases
+spans = SpanRecorder()
+
+# Set to a file path to export the spans once the Layer Atlas page has loaded
+TRACE_FILE_ENV = "LAYERATLAS_TRACE_FILE"
+
+
+def timed_span(name, **args):
+    """Context manager recording the duration of the enclosed block in the plugin spans."""
+    return spans.span(name, **args)
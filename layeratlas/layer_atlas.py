@@ -23,12 +23,23 @@
 """
 import os.path
 
-from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, Qt
+from qgis.core import QgsMapLayerType, QgsSettings
+from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication, Qt, QTimer
 from qgis.PyQt.QtGui import QIcon, QKeySequence
 from qgis.PyQt.QtWidgets import QAction
 
-from layeratlas.resources.resources import *
-from layeratlas.gui.layer_atlas_dockwidget import LayerAtlasDockWidget
+from layeratlas.helper.logging_helper import setup_logger, timed_span
+
+logger = setup_logger(__name__)
+
+# Build the web panel on first show instead of during QGIS startup
+SETTINGS_LAZY_STARTUP = "layeratlas/startup/lazy"
+# Build the web panel in the background once QGIS finished starting
+SETTINGS_PREWARM = "layeratlas/startup/prewarm"
+# Whether the panel was left open, only an explicitly saved True restores it after QGIS finished starting
+SETTINGS_DOCK_VISIBLE = "layeratlas/startup/dockVisible"
+
+PREWARM_DELAY = 2000  # milliseconds after QGIS initialization
 
 
 class LayerAtlas:
@@ -65,6 +76,8 @@ class LayerAtlas:
 
         self.pluginIsActive = False
         self.dockwidget = None
+        self.dock_registered = False
+        self.contextMenuActions = []
 
     def tr(self, message):
         """Get the translation for a string using Qt translation API.
@@ -157,22 +170,38 @@ class LayerAtlas:
 
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
-
-        icon_path = ":/icons/layer_atlas.png"
-        self.add_action(
-            icon_path,
-            text=self.tr("Layer Atlas (Tab)"),
-            callback=self.run,
-            parent=self.iface.mainWindow(),
-        )
-
-        # will be set False in run()
-        self.first_start = True
-        self.run()
+        with timed_span("initGui"):
+            icon_path = os.path.join(self.plugin_dir, "resources", "icons", "layer_atlas.png")
+            self.add_action(
+                icon_path,
+                text=self.tr("Layer Atlas (Tab)"),
+                callback=self.run,
+                parent=self.iface.mainWindow(),
+            )
+            self.add_actions_layer_tree()
+
+            # will be set False in create_dockwidget()
+            self.first_start = True
+
+            settings = QgsSettings()
+            if not settings.value(SETTINGS_LAZY_STARTUP, True, type=bool):
+                self.run()
+            elif settings.value(SETTINGS_PREWARM, False, type=bool) or settings.value(
+                SETTINGS_DOCK_VISIBLE, False, type=bool
+            ):
+                self.iface.initializationCompleted.connect(self.schedule_prewarm)
 
     def unload(self):
         """Removes the plugin menu item and icon from QGIS GUI."""
-        self.dockwidget.cleanup_on_close()
+        self.remove_actions_layer_tree()
+        if self.dockwidget is not None:
+            self.dockwidget.cleanup_on_close()
+
+        # Stop the download engine thread if a dataset download started it
+        from layeratlas.core.async_download_engine import AsyncDownloadEngine
+
+        if AsyncDownloadEngine._instance is not None:
+            AsyncDownloadEngine._instance.shutdown()
 
         for action in self.actions:
             self.iface.removePluginWebMenu(self.tr("&Layer Atlas"), action)
@@ -180,15 +209,92 @@ class LayerAtlas:
         # remove the toolbar
         del self.toolbar
 
+    def add_actions_layer_tree(self):
+        """Add custom actions to the layer tree context menu for uploading layers to Layer Atlas."""
+        logger.debug("Adding custom actions to layer tree context menu")
+        for layer_type in QgsMapLayerType:
+            uploadAction = QAction("Add to Layer Atlas")
+            uploadAction.setIcon(
+                QIcon(os.path.join(self.plugin_dir, "resources", "icons", "upload_sign.svg"))
+            )
+            uploadAction.triggered.connect(self.add_layer_to_layer_atlas)
+            self.iface.addCustomActionForLayerType(uploadAction, None, layer_type, True)
+            self.contextMenuActions.append(uploadAction)
+        logger.info(f"Successfully added {len(self.contextMenuActions)} context menu actions for layer types")
+
+    def remove_actions_layer_tree(self):
+        """Removes custom actions from the layer tree context menu."""
+        logger.debug(f"Removing {len(self.contextMenuActions)} custom actions from layer tree context menu")
+        for uploadAction in self.contextMenuActions:
+            self.iface.removeCustomActionForLayerType(uploadAction)
+        self.contextMenuActions = []
+        logger.info("Successfully removed all context menu actions")
+
+    def add_layer_to_layer_atlas(self):
+        """Upload the selected layers, opening the panel first if needed."""
+        self.create_dockwidget()
+        # A prewarmed panel is still hidden and not yet added to the QGIS panels
+        self.show_dockwidget()
+        self.dockwidget.add_layer_to_layer_atlas()
+        QgsSettings().setValue(SETTINGS_DOCK_VISIBLE, True)
+
+    def schedule_prewarm(self):
+        """Build the panel shortly after QGIS finished starting."""
+        QTimer.singleShot(PREWARM_DELAY, self.prewarm)
+
+    def prewarm(self):
+        """Build the panel in the background, showing it only if it was open last time."""
+        if not self.first_start:
+            return
+
+        logger.info("Prewarming Layer Atlas panel")
+        self.create_dockwidget(QgsSettings().value(SETTINGS_DOCK_VISIBLE, False, type=bool))
+
+    def create_dockwidget(self, visible=True):
+        """
+        Create the dock widget and its web view on first use.
+
+        Args:
+            visible (bool): Show the panel, a hidden panel is docked without appearing on screen.
+        """
+        if not self.first_start:
+            return
+
+        with timed_span("create dock widget"):
+            from layeratlas.gui.layer_atlas_dockwidget import LayerAtlasDockWidget
+
+            self.dockwidget = LayerAtlasDockWidget(self.iface)
+        self.dockwidget.closed.connect(self.dockwidget_closed)
+        if visible:
+            self.iface.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.dockwidget)
+        else:
+            # QGIS shows the docks it adds, a hidden panel is registered with it when first shown
+            self.dockwidget.hide()
+            self.iface.mainWindow().addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.dockwidget)
+        self.dock_registered = visible
+        self.first_start = False
+
+    def show_dockwidget(self):
+        """Show the panel, adding it to the QGIS panels if it was created hidden."""
+        if not self.dock_registered:
+            self.iface.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.dockwidget)
+            self.dock_registered = True
+        self.dockwidget.show()
+
+    def dockwidget_closed(self):
+        QgsSettings().setValue(SETTINGS_DOCK_VISIBLE, False)
+
     def run(self):
         """Run method that loads and starts the plugin"""
 
         if self.first_start == True:
-            self.dockwidget = LayerAtlasDockWidget(self.iface)
-            self.iface.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.dockwidget)
-            self.first_start = False
+            self.create_dockwidget()
+            self.dockwidget.show()
+            QgsSettings().setValue(SETTINGS_DOCK_VISIBLE, True)
         else:
             if self.dockwidget.isVisible() == True:
                 self.dockwidget.hide()
+                QgsSettings().setValue(SETTINGS_DOCK_VISIBLE, False)
             else:
-                self.dockwidget.show()
+                self.show_dockwidget()
+                QgsSettings().setValue(SETTINGS_DOCK_VISIBLE, True)
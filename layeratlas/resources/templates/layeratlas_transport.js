@@ -0,0 +1,146 @@
+"use strict";
+
+// QWebChannel transport for the WebSocket served by the Layer Atlas plugin.
+//
+// It negotiates the framing and batching with the plugin (see communication/web_socket_transport.py)
+// and hands decoded, unbatched messages to the QWebChannel. Usage:
+//
+//     new LayerAtlasTransport(new WebSocket("ws://localhost:56346"), function (transport) {
+//         new QWebChannel(transport, function (channel) { ... });
+//     });
+//
+// Pages announce the messages they handle beyond the transport with a third argument, e.g.
+// ["createLayers"] for the EmitCreateLayers batches of layer uploads.
+
+var LAYER_ATLAS_TRANSPORT_KEY = "layeratlasTransport";
+var LAYER_ATLAS_TRANSPORT_FORMATS = ["binary", "text"];
+var LAYER_ATLAS_TRANSPORT_FEATURES = ["batch", "payload"];
+// Compressed frames need the Compression Streams API
+if (typeof DecompressionStream !== "undefined" && typeof CompressionStream !== "undefined") {
+    LAYER_ATLAS_TRANSPORT_FEATURES.push("deflate");
+}
+var LAYER_ATLAS_BATCH_KEY = "layeratlasBatch";
+// Binary payload frames: "LAP1" | header length (uint32, big endian) | JSON header | data
+var LAYER_ATLAS_PAYLOAD_MAGIC = "LAP1";
+// Compressed frames: "LAZ1" | zlib stream of the UTF-8 JSON message
+var LAYER_ATLAS_COMPRESSED_MAGIC = "LAZ1";
+// Messages at least this long are sent compressed when the plugin accepted "deflate"
+var LAYER_ATLAS_COMPRESSION_THRESHOLD = 16 * 1024;
+// Plugin versions without negotiation never answer, text framing is assumed after this delay
+var LAYER_ATLAS_NEGOTIATION_TIMEOUT = 1000;
+
+var LayerAtlasTransport = function(socket, readyCallback, pageFeatures)
+{
+    var transport = this;
+    var decoder = new TextDecoder("utf-8");
+    var ready = false;
+    // Compression is asynchronous, these chains keep the messages in order in both directions
+    var received = Promise.resolve();
+    var sent = Promise.resolve();
+
+    this.format = "text";
+    this.features = [];
+    this.onmessage = null;
+    // Called with (header, Blob) for binary payloads such as map snapshots
+    this.onpayload = null;
+
+    this.send = function(data)
+    {
+        if (transport.features.indexOf("deflate") === -1 || data.length < LAYER_ATLAS_COMPRESSION_THRESHOLD) {
+            sent = sent.then(function() { socket.send(data); });
+            return;
+        }
+        sent = sent.then(function() { return deflate(data); }).then(function(compressed) {
+            socket.send(new Blob([LAYER_ATLAS_COMPRESSED_MAGIC, compressed]));
+        }).catch(console.error);
+    }
+
+    function setReady(format, features)
+    {
+        if (ready) {
+            return;
+        }
+        ready = true;
+        transport.format = format;
+        transport.features = features || [];
+        readyCallback(transport);
+    }
+
+    this.handleMessage = function(message)
+    {
+        if (transport.onmessage) {
+            transport.onmessage({data: message});
+        }
+    }
+
+    function magic(buffer)
+    {
+        return String.fromCharCode.apply(null, new Uint8Array(buffer, 0, Math.min(4, buffer.byteLength)));
+    }
+
+    function deflate(text)
+    {
+        var stream = new Blob([text]).stream().pipeThrough(new CompressionStream("deflate"));
+        return new Response(stream).arrayBuffer();
+    }
+
+    function inflate(buffer)
+    {
+        var stream = new Blob([new Uint8Array(buffer, 4)]).stream().pipeThrough(new DecompressionStream("deflate"));
+        return new Response(stream).arrayBuffer();
+    }
+
+    function handlePayload(buffer)
+    {
+        var headerLength = new DataView(buffer).getUint32(4);
+        var header = JSON.parse(decoder.decode(new Uint8Array(buffer, 8, headerLength)));
+        var blob = new Blob([new Uint8Array(buffer, 8 + headerLength)], {type: header.mimeType});
+        if (transport.onpayload) {
+            transport.onpayload(header, blob);
+        }
+    }
+
+    socket.binaryType = "arraybuffer";
+    socket.onmessage = function(event)
+    {
+        var data = event.data;
+        if (typeof data !== "string" && magic(data) === LAYER_ATLAS_COMPRESSED_MAGIC) {
+            received = received.then(function() { return inflate(data); }).then(handleFrame).catch(console.error);
+        } else {
+            received = received.then(function() { handleFrame(data); }).catch(console.error);
+        }
+    }
+
+    function handleFrame(data)
+    {
+        if (typeof data !== "string") {
+            if (magic(data) === LAYER_ATLAS_PAYLOAD_MAGIC) {
+                handlePayload(data);
+                return;
+            }
+            data = decoder.decode(data);
+        }
+        var message = JSON.parse(data);
+
+        if (message.hasOwnProperty(LAYER_ATLAS_TRANSPORT_KEY)) {
+            setReady(message[LAYER_ATLAS_TRANSPORT_KEY].format, message[LAYER_ATLAS_TRANSPORT_KEY].features);
+            return;
+        }
+        if (message.hasOwnProperty(LAYER_ATLAS_BATCH_KEY)) {
+            message[LAYER_ATLAS_BATCH_KEY].forEach(transport.handleMessage);
+            return;
+        }
+        transport.handleMessage(message);
+    }
+
+    socket.onopen = function()
+    {
+        var handshake = {};
+        handshake[LAYER_ATLAS_TRANSPORT_KEY] = {
+            formats: LAYER_ATLAS_TRANSPORT_FORMATS,
+            features: LAYER_ATLAS_TRANSPORT_FEATURES.concat(pageFeatures || []),
+        };
+        socket.send(JSON.stringify(handshake));
+        setTimeout(function() { setReady("text", []); }, LAYER_ATLAS_NEGOTIATION_TIMEOUT);
+    }
+};
@@ -0,0 +1,149 @@
+"""
+Tests of the archive extraction of downloaded datasets.
+
+They need the QGIS Python bindings, run them with the interpreter shipped with QGIS:
+
+    python -m pytest tests
+"""
+import io
+import os
+import sys
+import tarfile
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("qgis.core")
+
+from layeratlas.core import archive_extraction  # noqa: E402
+from layeratlas.core.archive_extraction import (  # noqa: E402
+    StreamingTarExtractor,
+    extract_archive,
+    extraction_folder,
+)
+
+
+def make_tar(mode, members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=f"w:{mode}") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def stream(extractor, data, chunk_size=64 * 1024):
+    for start in range(0, len(data), chunk_size):
+        extractor.write(memoryview(data)[start:start + chunk_size])
+
+
+def test_zip_nested_folders_extracted_in_parallel(tmp_path, monkeypatch):
+    # Several threads write into the same new subfolders
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    members = {f"top/d{folder}/sub/f{index}.txt": os.urandom(256) for folder in range(80) for index in range(4)}
+    archive_path = str(tmp_path / "nested.zip")
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+    for attempt in range(10):
+        target = str(tmp_path / f"out{attempt}")
+        assert extract_archive(archive_path, target)
+        for name, data in members.items():
+            assert (tmp_path / f"out{attempt}" / name).read_bytes() == data
+
+
+def test_zip_member_outside_target_rejected(tmp_path):
+    archive_path = str(tmp_path / "evil.zip")
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("../evil.txt", b"x")
+
+    target = extraction_folder(archive_path)
+    assert not extract_archive(archive_path, target)
+    assert not os.path.exists(tmp_path / "evil.txt")
+    assert not os.path.exists(target)
+
+
+def test_zip_corrupt_member_fails_and_cleans_up(tmp_path):
+    archive_path = str(tmp_path / "corrupt.zip")
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for index in range(8):
+            archive.writestr(f"data/f{index}.txt", b"layer atlas " * 10000)
+
+    # An invalid deflate block type in one member makes zlib raise
+    with zipfile.ZipFile(archive_path) as archive:
+        member = archive.getinfo("data/f3.txt")
+    data = bytearray(open(archive_path, "rb").read())
+    data[member.header_offset + 30 + len(member.filename) + len(member.extra)] = 0x07
+    with open(archive_path, "wb") as file:
+        file.write(data)
+
+    target = extraction_folder(archive_path)
+    assert not extract_archive(archive_path, target)
+    assert not os.path.exists(target)
+
+
+@pytest.mark.parametrize("mode", ["", "gz", "bz2", "xz"])
+def test_tar_stream_extracted(tmp_path, mode):
+    members = {f"data/f{index}.bin": os.urandom(50000) for index in range(20)}
+    data = make_tar(mode, members)
+
+    extractor = StreamingTarExtractor(str(tmp_path / "out"))
+    stream(extractor, data)
+    assert extractor.close(len(data))
+    for name, content in members.items():
+        assert (tmp_path / "out" / name).read_bytes() == content
+
+
+@pytest.mark.parametrize("mode", ["", "gz", "xz"])
+def test_truncated_tar_stream_fails(tmp_path, mode):
+    data = make_tar(mode, {f"f{index}.bin": os.urandom(50000) for index in range(20)})
+
+    extractor = StreamingTarExtractor(str(tmp_path / "out"))
+    stream(extractor, data[: len(data) // 2])
+    assert not extractor.close()
+    assert not os.path.exists(tmp_path / "out")
+
+
+def test_tar_stream_shorter_than_announced_fails(tmp_path):
+    data = make_tar("", {"f.bin": os.urandom(50000)})
+
+    # Only the padding after the end-of-archive marker is missing
+    extractor = StreamingTarExtractor(str(tmp_path / "out"))
+    stream(extractor, data[:-5])
+    assert not extractor.close(len(data))
+    assert not os.path.exists(tmp_path / "out")
+
+
+def test_tar_stream_aborted(tmp_path):
+    data = make_tar("gz", {f"f{index}.bin": os.urandom(50000) for index in range(20)})
+
+    extractor = StreamingTarExtractor(str(tmp_path / "out"))
+    stream(extractor, data[: len(data) // 2])
+    extractor.abort()
+    assert not os.path.exists(tmp_path / "out")
+
+
+def test_extraction_folder():
+    assert extraction_folder("/data/roads.tar.gz") == "/data/roads"
+    assert extraction_folder("/data/Parcels.ZIP") == "/data/Parcels"
+    assert archive_extraction.archive_format("roads.tgz") == archive_extraction.TAR
+    assert archive_extraction.archive_format("roads.gpkg") is None
+
+
+def test_tar_stream_unexpected_error_releases_the_download(tmp_path, monkeypatch):
+    def fail(target, member_name):
+        raise ValueError("path is on mount 'C:', start on mount 'D:'")
+
+    monkeypatch.setattr(archive_extraction, "safe_member_path", fail)
+    data = make_tar("", {f"f{index}.bin": os.urandom(50000) for index in range(100)})
+
+    # Far more chunks than the queue holds, writing would block if the thread stopped reading
+    extractor = StreamingTarExtractor(str(tmp_path / "out"))
+    stream(extractor, data, chunk_size=1024)
+    assert not extractor.close()
+    assert isinstance(extractor.error, ValueError)
+    assert not os.path.exists(tmp_path / "out")
@@ -0,0 +1,67 @@
+"""
+Tests of the streamed copy of download bodies.
+"""
+import gzip
+import io
+import os
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from urllib3 import HTTPResponse  # noqa: E402
+
+from layeratlas.core.download_io import stream_response  # noqa: E402
+
+
+class Response:
+    """The attributes of requests.Response read by stream_response."""
+
+    def __init__(self, body, headers):
+        self.headers = headers
+        self.raw = HTTPResponse(
+            body=io.BytesIO(body), headers=headers, status=200, preload_content=False, decode_content=False
+        )
+
+
+def encode(content, encoding):
+    if encoding == "gzip":
+        return gzip.compress(content)
+    return zlib.compress(content)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+@pytest.mark.parametrize("chunk_size", [None, 1024])
+def test_content_encoded_body_is_decoded(encoding, chunk_size):
+    # Highly compressible, every decoded chunk is much larger than the read size
+    content = b"layer atlas " * 200000 + os.urandom(100000)
+    body = encode(content, encoding)
+    response = Response(body, {"content-encoding": encoding, "content-length": str(len(body))})
+
+    file = io.BytesIO()
+    written = stream_response(response, file, chunk_size=chunk_size)
+
+    assert written == len(content)
+    assert file.getvalue() == content
+
+
+def test_identity_body_is_copied():
+    content = os.urandom(300000)
+    response = Response(content, {"content-length": str(len(content))})
+
+    file = io.BytesIO()
+    written = stream_response(response, file, chunk_size=4096)
+
+    assert written == len(content)
+    assert file.getvalue() == content
+
+
+def test_max_bytes_limits_the_copy():
+    content = os.urandom(300000)
+    response = Response(content, {"content-length": str(len(content))})
+
+    file = io.BytesIO()
+    assert stream_response(response, file, max_bytes=1000) == 1000
+    assert file.getvalue() == content[:1000]